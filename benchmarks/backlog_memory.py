@@ -0,0 +1,75 @@
+"""Measure the memory used per episode backlog item.
+
+Compares the backlog item layout before slotted items and shared show metadata (a plain object with its own
+metadata dict per episode) with the current EpisodeBacklogItem.
+
+    python benchmarks/backlog_memory.py [shows] [episodes_per_show]
+"""
+import sys
+import tracemalloc
+
+from slurp.backlog import EpisodeBacklogItem, ShowMetadata
+
+
+class LegacyEpisodeBacklogItem:
+    # The layout before slotted items: a unique key object and a metadata dict per episode.
+    def __init__(self, object_id, season, episode, metadata):
+        self.key = object()
+        self.object_id = object_id
+        self.season = season
+        self.episode = episode
+        self.metadata = metadata
+
+
+def make_shows(count):
+    return [
+        {
+            'ids': {'slug': 'show-{}'.format(i), 'trakt': i, 'tvdb': i, 'imdb': 'tt{}'.format(i), 'tmdb': i},
+            'title': 'Show {}'.format(i),
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_items(shows, episodes):
+    items = []
+    for show in shows:
+        for episode in range(1, episodes + 1):
+            items.append(LegacyEpisodeBacklogItem(show['ids']['slug'], 1, episode, {
+                'ids': show['ids'],
+                'show_title': show['title'],
+                'episode_title': 'Episode title {}'.format(episode),
+            }))
+    return items
+
+
+def current_items(shows, episodes):
+    items = []
+    for show in shows:
+        metadata = ShowMetadata(ids=show['ids'], show_title=show['title'])
+        for episode in range(1, episodes + 1):
+            items.append(EpisodeBacklogItem(show['ids']['slug'], 1, episode, metadata,
+                                            'Episode title {}'.format(episode)))
+    return items
+
+
+def measure(build, shows, episodes):
+    tracemalloc.start()
+    items = build(shows, episodes)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used / len(items)
+
+
+def main():
+    show_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    episodes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    shows = make_shows(show_count)
+
+    print('{} shows, {} episodes each'.format(show_count, episodes))
+    print('before: {:.0f} bytes/item'.format(measure(legacy_items, shows, episodes)))
+    print('after:  {:.0f} bytes/item'.format(measure(current_items, shows, episodes)))
+
+
+if __name__ == '__main__':
+    main()
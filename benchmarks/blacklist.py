@@ -0,0 +1,58 @@
+"""Compare the trie regex blacklist with testing every phrase against every title.
+
+    python benchmarks/blacklist.py [titles] [phrases]
+"""
+import random
+import string
+import sys
+import time
+
+from slurp.util import compile_phrase_matcher
+
+
+def random_word(rng, min_length=3, max_length=8):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(min_length, max_length)))
+
+
+def make_titles(rng, count, phrases):
+    titles = []
+    for _ in range(count):
+        words = [random_word(rng) for _ in range(rng.randint(3, 6))]
+        words.append('s{:02d}e{:02d}'.format(rng.randint(1, 10), rng.randint(1, 24)))
+        words.extend(['720p', 'hdtv', 'x264'])
+        if rng.random() < 0.1:
+            words.append(rng.choice(phrases))
+        titles.append('.'.join(words) + '-' + random_word(rng))
+    return titles
+
+
+def main():
+    title_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    phrase_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    rng = random.Random(0)
+    phrases = sorted({random_word(rng, 4, 10) for _ in range(phrase_count)} | {'core2hd', 'chamee'})
+    titles = make_titles(rng, title_count, phrases)
+
+    start = time.perf_counter()
+    naive = [not any(phrase in title for phrase in phrases) for title in titles]
+    naive_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = compile_phrase_matcher(phrases)
+    compile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    trie = [not matcher.search(title) for title in titles]
+    trie_time = time.perf_counter() - start
+
+    if naive != trie:
+        raise SystemExit('Results differ')
+
+    print('{} titles, {} phrases, {} blacklisted'.format(len(titles), len(phrases), naive.count(False)))
+    print('per phrase: {:.1f} ms'.format(naive_time * 1000))
+    print('trie regex: {:.1f} ms (+{:.1f} ms to compile)'.format(trie_time * 1000, compile_time * 1000))
+
+
+if __name__ == '__main__':
+    main()
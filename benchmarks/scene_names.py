@@ -0,0 +1,63 @@
+"""Compare the scene name fast path with guessit on generated release names.
+
+    python benchmarks/scene_names.py [count]
+"""
+import random
+import sys
+import time
+
+import guessit
+
+from slurp.util import parse_scene_name
+
+TITLES = ['Show.Name', 'The.Flash', 'House.of.Cards', 'Young.Sheldon', 'Lost', 'Doctor.Who.2005', 'The.Office.US']
+SCREEN_SIZES = ['480p', '720p', '1080p', '2160p']
+SOURCES = ['HDTV', 'WEB', 'WEB-DL', 'WEBRip', 'BluRay', 'AMZN.WEB-DL', 'NF.WEB']
+CODECS = ['x264', 'x265', 'h264', 'HEVC', 'XviD']
+FLAGS = ['', '', '', 'PROPER', 'REPACK', 'REAL.PROPER', 'INTERNAL']
+GROUPS = ['GRP', 'KILLERS', 'DIMENSION', 'NTb']
+
+
+def make_names(rng, count):
+    names = []
+    for _ in range(count):
+        parts = [rng.choice(TITLES), 'S{:02d}E{:02d}'.format(rng.randint(1, 12), rng.randint(1, 24))]
+        flag = rng.choice(FLAGS)
+        if flag:
+            parts.append(flag)
+        parts.extend([rng.choice(SCREEN_SIZES), rng.choice(SOURCES), rng.choice(CODECS)])
+        names.append('.'.join(parts) + '-' + rng.choice(GROUPS))
+    return names
+
+
+def normalized_guessit(name):
+    info = dict(guessit.guessit(name))
+    if isinstance(info.get('episode'), int):
+        info['episode'] = [info['episode']]
+    return info
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    names = make_names(random.Random(0), count)
+
+    start = time.perf_counter()
+    fast = [parse_scene_name(name) for name in names]
+    fast_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    slow = [normalized_guessit(name) for name in names]
+    slow_time = time.perf_counter() - start
+
+    handled = [(name, info, expected) for name, info, expected in zip(names, fast, slow) if info is not None]
+    mismatches = [name for name, info, expected in handled if info != expected]
+    for name in mismatches:
+        print('mismatch: {}'.format(name))
+
+    print('{} names, {} on the fast path, {} mismatches'.format(len(names), len(handled), len(mismatches)))
+    print('fast path: {:.1f} us/name'.format(fast_time / len(names) * 1e6))
+    print('guessit:   {:.1f} ms/name'.format(slow_time / len(names) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,39 +1,88 @@
+import asyncio
 import logging
 
-from slurp.util import filter_show_name
+from slurp.matcher import ReleaseMatcher, episode_match_profile
+from slurp.pipeline import Stage
 
 logger = logging.getLogger(__name__)
 
 
+class ShowMetadata(dict):
+    __slots__ = ('_match_profile',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._match_profile = None
+
+    def __setitem__(self, key, value):
+        if key == 'show_title' and self.get(key) != value:
+            self._match_profile = None
+        super().__setitem__(key, value)
+
+    @property
+    def match_profile(self):
+        if self._match_profile is None:
+            self._match_profile = episode_match_profile(self['show_title'])
+        return self._match_profile
+
+
 class BacklogItem:
-    def __init__(self, object_id, metadata):
-        self.key = object()
+    __slots__ = ('object_id', 'metadata', 'aired', 'next_search', 'search_attempts')
+
+    kind = None
+
+    def __init__(self, object_id, metadata, aired=None):
         self.object_id = object_id
         self.metadata = metadata
+        self.aired = aired
+        self.next_search = 0
+        self.search_attempts = 0
+
+    @property
+    def key(self):
+        return self
 
-    def identity(self):
+    def index_key(self):
         raise NotImplemented
 
+    def ref(self):
+        return [self.kind, *self.index_key()]
 
-class EpisodeBacklogItem:
-    def __init__(self, object_id, season, episode, metadata):
-        self.key = object()
-        self.object_id = object_id
+    def state(self):
+        return {
+            'metadata': self.metadata,
+            'aired': self.aired,
+            'next_search': self.next_search,
+            'search_attempts': self.search_attempts,
+        }
+
+    def __hash__(self):
+        return hash(self.index_key())
+
+
+class EpisodeBacklogItem(BacklogItem):
+    __slots__ = ('season', 'episode', 'episode_title')
+
+    kind = 'episode'
+
+    def __init__(self, object_id, season, episode, metadata, episode_title=None, aired=None):
+        super().__init__(object_id, metadata, aired)
         self.season = season
         self.episode = episode
-        self.metadata = metadata
+        self.episode_title = episode_title
 
-    def identity(self):
-        return (
-            filter_show_name(self.metadata['show_title']),
-            self.season,
-            self.episode,
-        )
+    def index_key(self):
+        return self.object_id, self.season, self.episode
+
+    def state(self):
+        return dict(super().state(), episode_title=self.episode_title)
 
     def __eq__(self, other):
         return isinstance(other, EpisodeBacklogItem) and self.object_id == other.object_id and \
                self.season == other.season and self.episode == other.episode
 
+    __hash__ = BacklogItem.__hash__
+
     def __str__(self):
         return '{show_title} S{season:02d}E{episode:02d}'.format(
             season=self.season,
@@ -43,57 +92,128 @@ class EpisodeBacklogItem:
 
 
 class MovieBacklogItem(BacklogItem):
-    def __init__(self, object_id, metadata):
-        super().__init__(object_id, metadata)
+    __slots__ = ()
 
-    def identity(self):
-        return (
-            filter_show_name(self.metadata['movie_title']),
-            self.metadata['year'],
-        )
+    kind = 'movie'
+
+    def __init__(self, object_id, metadata, aired=None):
+        super().__init__(object_id, metadata, aired)
+
+    def index_key(self):
+        return self.object_id,
 
     def __eq__(self, other):
         return isinstance(other, MovieBacklogItem) and self.object_id == other.object_id
 
+    __hash__ = BacklogItem.__hash__
+
     def __str__(self):
         return '{movie_title} ({year})'.format(**self.metadata)
 
 
 class Backlog:
-    def __init__(self, core):
+    def __init__(self, core, *, loop=None):
         self.core = core
+        self.loop = loop if loop is not None else asyncio.get_event_loop()
         self._backlog = {}
+        self._by_type = {}
+        self.matcher = ReleaseMatcher()
+        self._show_metadata = {}
+        self._pending = set()
+
+        self.enrich_stage = Stage(core, 'enrich', self._enrich_item, workers=4, queue_size=1000, loop=self.loop)
+
+    async def start(self):
+        pass
+
+    async def run(self):
+        await self.enrich_stage.run()
 
     async def add_item(self, item):
-        if self.find(item) is not None:
+        if item in self._pending or self.find(item) is not None:
             return
         logger.info('Adding {} to backlog queue'.format(item))
 
-        await self.core.metadata.enrich(item)
+        self._intern_show_metadata(item)
+        self._pending.add(item)
+        await self.enrich_stage.put(item)
+
+    async def _enrich_item(self, item):
+        if item not in self._pending:
+            # Removed while waiting to be enriched.
+            return
+
+        show_title = item.metadata.get('show_title')
+        try:
+            await self.core.metadata.enrich(item)
+        except:
+            self._pending.discard(item)
+            raise
+
+        if item not in self._pending:
+            # Removed while being enriched.
+            return
+        self._pending.discard(item)
+
+        if self.find(item) is not None:
+            return
+        self._index(item)
+
+        if isinstance(item, EpisodeBacklogItem) and item.metadata['show_title'] != show_title:
+            # The shared show title changed, episodes that were already indexed need new match keys.
+            for episode in self._by_type[EpisodeBacklogItem][item.object_id]:
+                self.matcher.add(episode)
+                self.core.state.add_backlog_item(episode)
+        else:
+            self.core.state.add_backlog_item(item)
 
-        self._backlog[item.key] = item
+        await self.core.search.enqueue(item)
 
-        await self.core.search.search_backlog_item(item)
+    def restore(self):
+        for ref, state in self.core.state.backlog_items():
+            item = self._item_from_ref(ref, state)
+            if item is None:
+                logger.warning('Ignoring unknown backlog item type {}'.format(ref[0]))
+            elif self.find(item) is None:
+                self._intern_show_metadata(item)
+                self._index(item)
+        logger.info('Restored {} items to backlog queue'.format(len(self._backlog)))
 
     def remove_item(self, item):
+        self._pending.discard(item)
         item = self.find(item)
         if item is not None:
-            del self._backlog[item.key]
+            self._unindex(item)
+            self.core.state.remove_backlog_item(item)
             logger.info('Removed {} from backlog queue'.format(item))
 
     def object_ids(self, restrict_type=None):
-        return set(
-            item.object_id
-            for item in self._backlog.values()
-            if restrict_type is None or isinstance(type, restrict_type)
-        )
+        return set().union(*(
+            object_ids.keys()
+            for item_type, object_ids in self._by_type.items()
+            if restrict_type is None or issubclass(item_type, restrict_type)
+        ))
 
     def remove_by_object_id(self, object_id):
-        items = [item for item in self._backlog.values() if item.object_id == object_id]
+        self._pending.difference_update([item for item in self._pending if item.object_id == object_id])
+
+        items = [
+            item
+            for object_ids in self._by_type.values()
+            for item in object_ids.get(object_id, ())
+        ]
         for item in items:
-            del self._backlog[item.key]
+            self._unindex(item)
+            self.core.state.remove_backlog_item(item)
             logger.info('Removed {} from backlog queue'.format(item))
 
+    def episodes(self, object_id, season):
+        return [
+            item
+            for item in self._by_type.get(EpisodeBacklogItem, {}).get(object_id, ())
+            if item.season == season
+        ]
+
     def empty(self):
         return not bool(self._backlog)
 
@@ -107,8 +227,51 @@ class Backlog:
         return self._backlog[item]
 
     def find(self, placeholder):
-        for item in self._backlog.values():
-            if item == placeholder:
-                return item
+        return self._backlog.get(placeholder)
+
+    def find_by_ref(self, ref):
+        placeholder = self._item_from_ref(ref, {'metadata': None})
+        if placeholder is None:
+            return None
+        return self.find(placeholder)
+
+    @staticmethod
+    def _item_from_ref(ref, state):
+        kind, *index_key = ref
+        if kind == EpisodeBacklogItem.kind:
+            item = EpisodeBacklogItem(*index_key, state['metadata'], state.get('episode_title'), state.get('aired'))
+        elif kind == MovieBacklogItem.kind:
+            item = MovieBacklogItem(*index_key, state['metadata'], state.get('aired'))
         else:
             return None
+        item.next_search = state.get('next_search', 0)
+        item.search_attempts = state.get('search_attempts', 0)
+        return item
+
+    def _intern_show_metadata(self, item):
+        if not isinstance(item, EpisodeBacklogItem):
+            return
+        metadata = self._show_metadata.get(item.object_id)
+        if metadata is None:
+            metadata = self._show_metadata[item.object_id] = ShowMetadata(item.metadata)
+        elif 'season_episodes' in item.metadata:
+            # New episodes air, keep the season sizes of the shared metadata current.
+            metadata['season_episodes'] = item.metadata['season_episodes']
+        item.metadata = metadata
+
+    def _index(self, item):
+        self._backlog[item] = item
+        self._by_type.setdefault(type(item), {}).setdefault(item.object_id, set()).add(item)
+        self.matcher.add(item)
+
+    def _unindex(self, item):
+        del self._backlog[item]
+
+        type_object_ids = self._by_type[type(item)]
+        type_items = type_object_ids[item.object_id]
+        type_items.remove(item)
+        if not type_items:
+            del type_object_ids[item.object_id]
+            if isinstance(item, EpisodeBacklogItem):
+                self._show_metadata.pop(item.object_id, None)
+        self.matcher.remove(item)
@@ -1,14 +1,19 @@
 import asyncio
 import logging
 import os
+import signal
 from configparser import NoSectionError
 
 import pkg_resources
 from slurp.backlog import Backlog
 from slurp.download import Download
 from slurp.metadata import Metadata
+from slurp.metrics import Metrics
 from slurp.plugin_types import BackendPlugin
 from slurp.search import Search
+from slurp.state import State
+from slurp.util import GuessCache, guess_cache
+from slurp.workers import WorkerPool
 
 logger = logging.getLogger(__name__)
 
@@ -20,16 +25,31 @@ class Core:
         self.session = session
         self.loop = loop if loop is not None else asyncio.get_event_loop()
 
-        self.backlog = Backlog(self)
+        try:
+            section = dict(config.items('slurp'))
+        except NoSectionError:
+            section = {}
+
+        state_path = section.get(
+            'state_path',
+            os.path.join(os.path.dirname(config_path) or '.', 'slurp.db'),
+        ) or ':memory:'
+        self.state = State(state_path, loop=self.loop)
+        self.metrics = Metrics(self, loop=self.loop)
+        self.workers = WorkerPool(self, loop=self.loop)
+
+        guess_cache.configure(
+            maxsize=int(section.get('guess_cache_size', GuessCache.maxsize)),
+            path=section.get('guess_cache_path') or None,
+        )
+        self.metrics.register('guess_cache', guess_cache.stats)
+
+        self.backlog = Backlog(self, loop=self.loop)
         self.metadata = Metadata(self, loop=self.loop)
         self.search = Search(self, loop=self.loop)
         self.download = Download(self, loop=self.loop)
 
-        try:
-            section = dict(config.items('slurp'))
-            backend_name = section.get('backend', 'trakt')
-        except NoSectionError:
-            backend_name = 'trakt'
+        backend_name = section.get('backend', 'trakt')
 
         for entrypoint in pkg_resources.iter_entry_points('slurp.plugins.backend'):
             plugin_class = entrypoint.load()
@@ -45,12 +65,29 @@ class Core:
             self.backend = None
 
     async def run(self):
-        engines = [self.metadata, self.search, self.download]
+        engines = [self.metrics, self.backlog, self.metadata, self.search, self.download]
         if self.backend is not None:
             engines.append(self.backend)
 
-        await asyncio.gather(*(e.start() for e in engines))
-        await asyncio.gather(*(e.run() for e in engines))
+        self.backlog.restore()
+        try:
+            self.loop.add_signal_handler(signal.SIGHUP, self.reload_config)
+        except (AttributeError, NotImplementedError):
+            pass
+
+        try:
+            await asyncio.gather(*(e.start() for e in engines))
+            await asyncio.gather(*(e.run() for e in engines))
+        finally:
+            self.workers.shutdown()
+            guess_cache.flush()
+            self.state.checkpoint()
+
+    def reload_config(self):
+        logger.info('Reloading configuration from {}'.format(self.config_path))
+        self.config.clear()
+        self.config.read(self.config_path)
+        self.search.load_config()
 
     def save_config(self):
         with open(self.config_path + '.tmp', 'w') as f:
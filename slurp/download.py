@@ -1,53 +1,20 @@
 import asyncio
 import logging
-import os
 
+from slurp.pipeline import Stage
 from slurp.plugin_types import DownloadPlugin, PreProcessingPlugin, PostProcessingPlugin
-from slurp.util import load_plugins, filter_show_name, guess_media_info
+from slurp.util import load_plugins
 
 logger = logging.getLogger(__name__)
 
 
-def guess_identity_for_path(path):
-    filename = os.path.split(path)[1]
-
-    info = guess_media_info(filename)
-    if info.get('type') not in ('episode', 'movie') or \
-            (info['type'] == 'episode' and ('season' not in info or 'episode' not in info)) or \
-            (info['type'] == 'movie' and 'year' not in info):
-        info = guess_media_info(path)
-        if info.get('type') not in ('episode', 'movie') or \
-                (info['type'] == 'episode' and ('season' not in info or 'episode' not in info)) or \
-                (info['type'] == 'movie' and 'year' not in info):
-            return []
-
-    if info['type'] == 'episode':
-        show = filter_show_name(info['title'])
-        if 'year' in info:
-            show += ' {}'.format(info['year'])
-        if 'country' in info:
-            show += ' {}'.format(str(info['country']).lower())
-
-        season = info['season']
-        if isinstance(info['episode'], int):
-            episodes = frozenset([info['episode']])
-        else:
-            episodes = frozenset(info['episode'])
-
-        return frozenset([
-            (show, season, episode)
-            for episode in episodes
-        ])
-    else:
-        return frozenset([(filter_show_name(info['title']), info['year'])])
-
-
 class Download:
     def __init__(self, core, *, loop=None):
         self.core = core
         self.loop = loop if loop is not None else asyncio.get_event_loop()
 
         self._blacklist = []
+        self._queued = set()
 
         self.pre_processing_plugin_map = load_plugins('pre_processing', PreProcessingPlugin, 10, core, loop=self.loop)
         self.pre_processing_plugins = list(self.pre_processing_plugin_map.values())
@@ -58,20 +25,40 @@ class Download:
         self.download_plugin_map = load_plugins('download', DownloadPlugin, 10, core, loop=self.loop)
         self.download_plugins = list(self.download_plugin_map.values())
 
+        self.download_stage = Stage(core, 'download', self._download_queued, workers=1, queue_size=100,
+                                    loop=self.loop)
+
     async def start(self):
         plugins = self.pre_processing_plugins + self.post_processing_plugins + self.download_plugins
         return await asyncio.gather(*(plugin.start() for plugin in plugins))
 
     async def run(self):
         plugins = self.pre_processing_plugins + self.post_processing_plugins + self.download_plugins
-        return await asyncio.gather(*(plugin.run() for plugin in plugins))
+        return await asyncio.gather(self.download_stage.run(), *(plugin.run() for plugin in plugins))
 
     @property
     def supported_media(self):
         return set().union(*(provider.media for provider in self.download_plugins))
 
     def is_downloading(self, backlog_item):
-        return any(provider.is_downloading(backlog_item) for provider in self.download_plugins)
+        return backlog_item in self._queued or \
+               any(provider.is_downloading(backlog_item) for provider in self.download_plugins)
+
+    async def enqueue(self, backlog_items, data):
+        backlog_items = [
+            backlog_item
+            for backlog_item in backlog_items
+            if not self.is_downloading(backlog_item)
+        ]
+        if not backlog_items:
+            return
+
+        self._queued.update(backlog_items)
+        await self.download_stage.put(backlog_items, data)
+
+    async def _download_queued(self, backlog_items, data):
+        self._queued.difference_update(backlog_items)
+        await self.download(backlog_items, data)
 
     async def download(self, backlog_items, data):
         backlog_items = [
@@ -82,7 +69,7 @@ class Download:
         if not backlog_items:
             return
 
-        media = set(data['media'])
+        media = set(data.media)
 
         for provider in self.download_plugins:
             if media & set(provider.media):
@@ -96,17 +83,10 @@ class Download:
         for processor in self.pre_processing_plugins:
             files = await processor.process(files)
 
-        identity_backlog_item_key_map = {
-            backlog_item.identity(): backlog_item.key
-            for backlog_item in self.core.backlog.values()
-        }
-
         def find_backlog_keys(path):
-            episode_keys = guess_identity_for_path(path)
             return frozenset([
-                identity_backlog_item_key_map[episode_key]
-                for episode_key in episode_keys
-                if episode_key in identity_backlog_item_key_map
+                backlog_item.key
+                for backlog_item in self.core.backlog.matcher.match_path(path)
             ])
 
         files = {
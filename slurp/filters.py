@@ -0,0 +1,47 @@
+from collections import OrderedDict
+
+
+def value_set(value):
+    if not isinstance(value, list):
+        value = [value]
+    return {str(v).lower() for v in value}
+
+
+def reject_values(key, values):
+    def predicate(result, info, backlog_item):
+        return values.isdisjoint(value_set(info.get(key, 'unknown')))
+    return predicate
+
+
+def require_values(key, values):
+    def predicate(result, info, backlog_item):
+        return not values.isdisjoint(value_set(info.get(key, 'unknown')))
+    return predicate
+
+
+class FilterChain:
+    def __init__(self, rejections=None):
+        self.rejections = rejections if rejections is not None else OrderedDict()
+        self._stages = []
+        self._info_stages = []
+
+    def add(self, name, predicate, *, needs_info=False):
+        # Stages run in the order they are added, add the cheap ones first.
+        if needs_info:
+            self._info_stages.append((name, predicate))
+        else:
+            self._stages.append((name, predicate))
+        self.rejections.setdefault(name, 0)
+
+    def accepts(self, result, backlog_item):
+        return self._accepts(self._stages, result, None, backlog_item)
+
+    def accepts_info(self, result, info, backlog_item):
+        return self._accepts(self._info_stages, result, info, backlog_item)
+
+    def _accepts(self, stages, result, info, backlog_item):
+        for name, predicate in stages:
+            if not predicate(result, info, backlog_item):
+                self.rejections[name] += 1
+                return False
+        return True
@@ -0,0 +1,121 @@
+import os
+
+from slurp.util import filter_show_name, guess_media_info
+
+
+def episode_match_profile(show_title):
+    info = guess_media_info(show_title + ' S01E01')
+    return (
+        filter_show_name(info.get('title', show_title)),
+        info.get('year'),
+        info.get('country'),
+    )
+
+
+def movie_match_profile(movie_title):
+    info = guess_media_info(movie_title, movie=True)
+    return filter_show_name(info.get('title', movie_title))
+
+
+def is_complete_info(info):
+    if info.get('type') == 'episode':
+        return 'title' in info and 'season' in info and 'episode' in info
+    elif info.get('type') == 'movie':
+        return 'title' in info and 'year' in info
+    else:
+        return False
+
+
+class ReleaseMatcher:
+    def __init__(self):
+        self._episodes = {}
+        self._seasons = {}
+        self._movies = {}
+        self._keys = {}
+
+    def add(self, backlog_item):
+        if backlog_item.kind == 'episode':
+            title, year, country = backlog_item.metadata.match_profile
+            keys = [
+                (self._episodes, (title, backlog_item.season, backlog_item.episode)),
+                (self._seasons, (title, backlog_item.season)),
+            ]
+            qualifiers = (year, country)
+        elif backlog_item.kind == 'movie':
+            keys = [
+                (self._movies, (movie_match_profile(backlog_item.metadata['movie_title']),
+                                backlog_item.metadata['year'])),
+            ]
+            qualifiers = None
+        else:
+            return
+
+        self.remove(backlog_item)
+        for index, key in keys:
+            index.setdefault(key, {})[backlog_item] = qualifiers
+        self._keys[backlog_item] = keys
+
+    def remove(self, backlog_item):
+        for index, key in self._keys.pop(backlog_item, ()):
+            items = index[key]
+            del items[backlog_item]
+            if not items:
+                del index[key]
+
+    def match(self, info):
+        if 'title' not in info:
+            return set()
+
+        title = filter_show_name(str(info['title']))
+        year = info.get('year')
+        country = info.get('country')
+        matches = set()
+
+        if 'season' in info and 'episode' in info:
+            seasons = info['season']
+            if isinstance(seasons, int):
+                seasons = [seasons]
+            episodes = info['episode']
+            if isinstance(episodes, int):
+                episodes = [episodes]
+            for season in seasons:
+                for episode in episodes:
+                    items = self._episodes.get((title, season, episode), {})
+                    matches.update(self._qualified(items, year, country))
+
+        if year is not None:
+            matches.update(self._movies.get((title, year), ()))
+
+        return matches
+
+    def match_season(self, info):
+        # Season packs have a season but no episode, they cover every backlog episode of that season.
+        if 'title' not in info or 'season' not in info or 'episode' in info:
+            return set()
+
+        title = filter_show_name(str(info['title']))
+        seasons = info['season']
+        if isinstance(seasons, int):
+            seasons = [seasons]
+
+        matches = set()
+        for season in seasons:
+            items = self._seasons.get((title, season), {})
+            matches.update(self._qualified(items, info.get('year'), info.get('country')))
+        return matches
+
+    @staticmethod
+    def _qualified(items, year, country):
+        return (
+            backlog_item
+            for backlog_item, (show_year, show_country) in items.items()
+            if (show_year is None or show_year == year) and (show_country is None or show_country == country)
+        )
+
+    def match_path(self, path):
+        info = guess_media_info(os.path.split(path)[1])
+        if not is_complete_info(info):
+            info = guess_media_info(path)
+            if not is_complete_info(info):
+                return set()
+        return self.match(info)
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from configparser import NoSectionError
+
+logger = logging.getLogger(__name__)
+
+
+def percentiles(samples, points=(50, 90, 99)):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    return OrderedDict(
+        ('p{}'.format(point), samples[min(len(samples) - 1, len(samples) * point // 100)])
+        for point in points
+    )
+
+
+class Metrics:
+    _interval = 0
+
+    def __init__(self, core, *, loop=None):
+        self.core = core
+        self.loop = loop if loop is not None else asyncio.get_event_loop()
+        self._sources = OrderedDict()
+
+        try:
+            section = dict(core.config.items('slurp'))
+            self._interval = int(section.get('metrics_interval', self._interval))
+        except NoSectionError:
+            pass
+        except:
+            logger.exception('Invalid metrics configuration:')
+
+    def register(self, name, source):
+        self._sources[name] = source
+
+    def snapshot(self):
+        snapshot = OrderedDict()
+        for name, source in self._sources.items():
+            try:
+                snapshot[name] = source()
+            except:
+                logger.exception('Failed to collect metric {}:'.format(name))
+        return snapshot
+
+    async def start(self):
+        pass
+
+    async def run(self):
+        if not self._interval:
+            return
+
+        while True:
+            await asyncio.sleep(self._interval)
+            for name, value in self.snapshot().items():
+                logger.info('{}: {}'.format(name, value))
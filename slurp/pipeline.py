@@ -0,0 +1,62 @@
+import asyncio
+import itertools
+import logging
+from configparser import NoSectionError
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    _workers = 1
+    _queue_size = 0
+
+    def __init__(self, core, name, handler, *, workers=None, queue_size=None, prioritized=False, loop=None):
+        self.core = core
+        self.name = name
+        self.loop = loop if loop is not None else asyncio.get_event_loop()
+        self._handler = handler
+        self._prioritized = prioritized
+        self._sequence = itertools.count()
+
+        if workers is not None:
+            self._workers = workers
+        if queue_size is not None:
+            self._queue_size = queue_size
+
+        try:
+            section = dict(core.config.items('slurp.pipeline'))
+            self._workers = int(section.get('{}.workers'.format(name), self._workers))
+            self._queue_size = int(section.get('{}.queue_size'.format(name), self._queue_size))
+        except NoSectionError:
+            pass
+        except:
+            logger.exception('Invalid [slurp.pipeline] configuration for {} stage:'.format(name))
+
+        if prioritized:
+            self._queue = asyncio.PriorityQueue(self._queue_size)
+        else:
+            self._queue = asyncio.Queue(self._queue_size)
+        core.metrics.register('pipeline.{}.depth'.format(name), self._queue.qsize)
+
+    async def put(self, *args, priority=0):
+        # Blocks while the queue is full, applying back pressure to the producer.
+        if self._prioritized:
+            # Lowest priority first, the sequence number keeps equal priorities in order.
+            await self._queue.put((priority, next(self._sequence), args))
+        else:
+            await self._queue.put(args)
+
+    async def run(self):
+        await asyncio.gather(*(self._worker() for _ in range(self._workers)))
+
+    async def _worker(self):
+        while True:
+            args = await self._queue.get()
+            if self._prioritized:
+                args = args[2]
+            try:
+                await self._handler(*args)
+            except:
+                logger.exception('Error in {} stage:'.format(self.name))
+            finally:
+                self._queue.task_done()
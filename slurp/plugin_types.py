@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABCMeta, abstractmethod
 
 
@@ -30,6 +31,22 @@ class SearchPlugin(Plugin, metaclass=ABCMeta):
     async def search(self, backlog_item):
         ...
 
+    async def search_many(self, backlog_items):
+        # Items are grouped by show and season, override to search them in one go.
+        results = await asyncio.gather(*(self.search(backlog_item) for backlog_item in backlog_items))
+        return dict(zip(backlog_items, results))
+
+    async def search_iter(self, backlog_items):
+        # Yields (backlog_item, result) pairs, override to hand out results as soon as they come in.
+        for backlog_item, results in (await self.search_many(backlog_items)).items():
+            for result in results:
+                yield backlog_item, result
+
+    def changed_since(self, backlog_item, timestamp):
+        # Override when the plugin can tell new results for the item may have appeared, so a cached
+        # empty result is dropped before it expires.
+        return False
+
 
 class DownloadPlugin(Plugin, metaclass=ABCMeta):
     @abstractmethod
@@ -38,6 +55,8 @@ class DownloadPlugin(Plugin, metaclass=ABCMeta):
 
     @abstractmethod
     async def download(self, backlog_item, data):
+        # data is a slurp.results.SearchResult, its fields can also be read by key like the dicts
+        # that were passed before.
         ...
 
 
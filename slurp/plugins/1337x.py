@@ -7,9 +7,29 @@ from bs4 import BeautifulSoup
 
 from slurp.backlog import EpisodeBacklogItem, MovieBacklogItem
 from slurp.plugin_types import SearchPlugin
+from slurp.results import SearchResult
 
 logger = logging.getLogger(__name__)
 
+TORRENT_LINK = re.compile('^/torrent/')
+MAGNET_LINK = re.compile('^magnet:')
+
+
+def parse_search_page(html):
+    body = BeautifulSoup(html, 'lxml').tbody
+    if body is None:
+        return []
+
+    rows = []
+    for row in body('tr'):
+        link = row.find('td', class_='name').find('a', href=TORRENT_LINK)
+        rows.append((link['href'], str(link.string), int(row.find('td', class_='seeds').string)))
+    return rows
+
+
+def parse_magnet_uri(html):
+    return BeautifulSoup(html, 'lxml').find('a', href=MAGNET_LINK)['href']
+
 
 class LeetXSearchPlugin(SearchPlugin):
     def __init__(self, core, *, loop=None):
@@ -24,47 +44,80 @@ class LeetXSearchPlugin(SearchPlugin):
         pass
 
     async def search(self, backlog_item):
-        async def get_info(item):
-            link = item.find('td', class_='name').find('a', href=re.compile('^/torrent/'))
-            details_url = urllib.parse.urljoin(search_url, link['href'])
-            async with self.sem, self.core.session.get(details_url) as response:
-                try:
-                    response_text = await response.text()
-                except:
-                    logger.exception('Failed to parse response body:')
-                    return None
-
-            magnet_uri = BeautifulSoup(response_text, 'lxml').find('a', href=re.compile('^magnet:'))['href']
-            return {
-                'origin': self,
-                'title': str(link.string),
-                'verified': False,
-                'rank': int(item.find('td', class_='seeds').string),
-                'media': {
-                    'torrent:magnet': {
-                        'magnetURI': magnet_uri,
-                    },
-                },
-            }
+        return [result async for _, result in self.search_iter([backlog_item])]
+
+    async def search_iter(self, backlog_items):
+        queries = self._queries(backlog_items)
+
+        # Results are yielded straight from the search pages, the magnet link is only fetched from the
+        # details page of the result that actually gets downloaded.
+        tasks = [
+            asyncio.ensure_future(self._search_page(category, query, query_items), loop=self.loop)
+            for category, query, query_items in queries
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                query_items, search_url, rows = await task
+                for href, title, seeds in rows:
+                    result = self._make_result(urllib.parse.urljoin(search_url, href), title, seeds)
+                    for backlog_item in query_items:
+                        yield backlog_item, result
+        finally:
+            for task in tasks:
+                task.cancel()
 
-        if isinstance(backlog_item, EpisodeBacklogItem):
-            category = 'TV'
-        elif isinstance(backlog_item, MovieBacklogItem):
-            category = 'Movies'
-        else:
-            return []
-        query = str(backlog_item)
+    @staticmethod
+    def _queries(backlog_items):
+        seasons = {}
+        for backlog_item in backlog_items:
+            if isinstance(backlog_item, EpisodeBacklogItem):
+                seasons.setdefault((backlog_item.object_id, backlog_item.season), []).append(backlog_item)
+
+        queries = []
+        for episodes in seasons.values():
+            if len(episodes) > 1:
+                # One season query covers all the episodes, the matcher sorts out which result is which.
+                query = '{show_title} S{season:02d}'.format(season=episodes[0].season, **episodes[0].metadata)
+                queries.append(('TV', query, episodes))
+            else:
+                queries.append(('TV', str(episodes[0]), episodes))
+
+        for backlog_item in backlog_items:
+            if isinstance(backlog_item, MovieBacklogItem):
+                queries.append(('Movies', str(backlog_item), [backlog_item]))
+        return queries
+
+    async def _search_page(self, category, query, query_items):
         search_url = 'https://1337x.to/category-search/{}/{}/1/'.format(urllib.parse.quote_plus(query), category)
 
         async with self.sem, self.core.session.get(search_url) as response:
             response_text = await response.text()
 
-        body = BeautifulSoup(response_text, 'lxml').tbody
-        if body is None:
-            return []
+        return query_items, search_url, await self.core.workers.call(parse_search_page, response_text)
 
-        return [
-            item
-            for item in await asyncio.gather(*(get_info(item) for item in body('tr')))
-            if item is not None
-        ]
+    def _make_result(self, details_url, title, seeds):
+        async def resolve():
+            return {
+                'torrent:magnet': {
+                    'magnetURI': await self._fetch_magnet_uri(details_url),
+                },
+            }
+
+        return SearchResult(
+            self,
+            title,
+            {
+                'torrent:magnet': {
+                    'detailsURL': details_url,
+                },
+            },
+            verified=False,
+            rank=seeds,
+            resolver=resolve,
+        )
+
+    async def _fetch_magnet_uri(self, details_url):
+        async with self.sem, self.core.session.get(details_url) as response:
+            response_text = await response.text()
+
+        return await self.core.workers.call(parse_magnet_uri, response_text)
@@ -222,6 +222,16 @@ class DelugeRpcDownloadPlugin(DownloadPlugin):
         self._client = DelugeRpcClient(self._rpc_host, self._rpc_port, self._rpc_username, self._rpc_password)
 
     async def start(self):
+        for info_hash, refs in self.core.state.get('download.deluge_rpc.torrent_ids', {}).items():
+            backlog_items = [
+                backlog_item
+                for backlog_item in map(self.core.backlog.find_by_ref, refs)
+                if backlog_item is not None
+            ]
+            for backlog_item in backlog_items:
+                self._downloads[backlog_item.key] = info_hash
+            self._torrent_ids[info_hash] = backlog_items
+
         for origin, seed_limit in self._origin_seed_limit_by_name.items():
             plugin = self.core.search.plugin_map.get(origin)
             if plugin is not None:
@@ -235,6 +245,12 @@ class DelugeRpcDownloadPlugin(DownloadPlugin):
                 logger.exception('Failed to check downloads:')
             await asyncio.sleep(self._interval, loop=self.loop)
 
+    def _save_state(self):
+        self.core.state.set('download.deluge_rpc.torrent_ids', {
+            info_hash: [backlog_item.ref() for backlog_item in backlog_items]
+            for info_hash, backlog_items in self._torrent_ids.items()
+        })
+
     def is_downloading(self, backlog_item):
         return backlog_item.key in self._downloads
 
@@ -245,7 +261,7 @@ class DelugeRpcDownloadPlugin(DownloadPlugin):
             self._downloads[backlog_item.key] = None
             keys.append(backlog_item.key)
 
-        seed_limit = self._origin_seed_limit.get(data['origin'], self._seed_limit)
+        seed_limit = self._origin_seed_limit.get(data.origin, self._seed_limit)
         if seed_limit:
             options = {
                 'stop_at_ratio': True,
@@ -260,12 +276,12 @@ class DelugeRpcDownloadPlugin(DownloadPlugin):
             media = ('torrent:magnet', 'torrent:url')
 
         for medium in media:
-            if medium in data['media']:
+            if medium in data.media:
                 if medium == 'torrent:url':
-                    url = data['media']['torrent:url']['url']
+                    url = data.media['torrent:url']['url']
                     coro = self._add_torrent_url(url, options)
                 else:
-                    url = data['media']['torrent:magnet']['magnetURI']
+                    url = data.media['torrent:magnet']['magnetURI']
                     coro = self._add_torrent_magnet(url, options)
                 break
         else:
@@ -286,6 +302,7 @@ class DelugeRpcDownloadPlugin(DownloadPlugin):
         for backlog_item in backlog_items:
             self._downloads[backlog_item.key] = info_hash
         self._torrent_ids.setdefault(info_hash, []).extend(backlog_items)
+        self._save_state()
         try:
             await self._check_downloads([info_hash])
         except:
@@ -297,6 +314,7 @@ class DelugeRpcDownloadPlugin(DownloadPlugin):
 
         parsed_body = bencoder.decode(body)
         info_hash = hashlib.sha1(bencoder.encode(parsed_body[b'info'])).hexdigest()
+        self.core.search.learn_info_hash(url, info_hash)
 
         await self._client.call_remote(
             'core.add_torrent_file',
@@ -342,6 +360,7 @@ class DelugeRpcDownloadPlugin(DownloadPlugin):
             )
             for backlog_item in backlog_items:
                 del self._downloads[backlog_item.key]
+            self._save_state()
 
         if torrent_ids is None:
             torrent_ids = list(self._torrent_ids.keys())
@@ -365,6 +384,7 @@ class DelugeRpcDownloadPlugin(DownloadPlugin):
             backlog_items = self._torrent_ids.pop(missing_id)
             for backlog_item in backlog_items:
                 del self._downloads[backlog_item.key]
+            self._save_state()
 
         return await asyncio.gather(
             *(check_status(torrent_id, status) for torrent_id, status in result),
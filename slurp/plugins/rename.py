@@ -117,7 +117,7 @@ class RenameProcessingPlugin(PostProcessingPlugin):
             else:
                 episode_str = 'E%02d' % episodes[0]
 
-            title = UNSAFE_CHARS.sub(' ', '&'.join([e.metadata['episode_title'] for e in backlog_items]))
+            title = UNSAFE_CHARS.sub(' ', '&'.join([e.episode_title for e in backlog_items]))
 
             return os.path.join(
                 self._episode_destination,
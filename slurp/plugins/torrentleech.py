@@ -1,16 +1,17 @@
 import asyncio
 import json
 import logging
+import time
 
 import asyncpg
 import datetime
 import dateutil
-import guessit
 from babelfish import Language, Country
 from defusedxml.ElementTree import fromstring
 
 from slurp.backlog import EpisodeBacklogItem, MovieBacklogItem
 from slurp.plugin_types import SearchPlugin
+from slurp.results import SearchResult
 from slurp.util import filter_show_name
 
 logger = logging.getLogger(__name__)
@@ -35,6 +36,7 @@ class TorrentLeechSearchPlugin(SearchPlugin):
         self.core = core
         self.loop = loop if loop is not None else asyncio.get_event_loop()
         self._pool = None
+        self._updated = {}
 
         section = dict(core.config.items('slurp.search.torrentleech'))
         self._rss_url = 'https://rss.torrentleech.org/{}'.format(section['rss_key'])
@@ -93,7 +95,13 @@ class TorrentLeechSearchPlugin(SearchPlugin):
                 continue
 
             channel = root.find('channel')
-            for item in reversed(channel.findall('item')):
+            items = list(reversed(channel.findall('item')))
+            release_infos = await self.core.workers.guess_media_info([
+                item.find('link').text.rsplit('/', 1)[-1]
+                for item in items
+            ])
+            new_releases = []
+            for item, release_info in zip(items, release_infos):
                 title = item.find('title').text
                 pub_date = dateutil.parser.parse(item.find('pubDate').text, ignoretz=True)
                 guid = item.find('guid').text
@@ -120,22 +128,24 @@ class TorrentLeechSearchPlugin(SearchPlugin):
                 else:
                     leechers = None
 
-                try:
-                    metadata = dict(guessit.guessit(link.rsplit('/', 1)[-1]).items())
-                except Exception:
-                    logger.exception('Failed to parse TL data:')
+                metadata = release_info
+                if not metadata:
                     continue
+                if isinstance(metadata.get('episode'), list) and len(metadata['episode']) == 1:
+                    # Stored as a scalar so the search query can compare it directly.
+                    metadata['episode'] = metadata['episode'][0]
 
                 async with self._pool.acquire() as conn:
                     txn = conn.transaction()
                     await txn.start()
                     try:
-                        await self._pool.execute(
+                        inserted = await self._pool.fetchval(
                             '''
                                 INSERT INTO torrentleech (title, pubdate, guid, comments, link, description, category,
                                                           seeders, leechers, metadata)
                                 VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10::jsonb)
                                 ON CONFLICT (guid) DO UPDATE SET seeders = EXCLUDED.seeders, leechers = EXCLUDED.leechers
+                                RETURNING (xmax = 0)
                             ''',
                             title,
                             pub_date,
@@ -153,10 +163,97 @@ class TorrentLeechSearchPlugin(SearchPlugin):
                         await txn.rollback()
                     else:
                         await txn.commit()
+                        if inserted:
+                            release_key = self._release_key(metadata)
+                            if release_key is not None:
+                                self._updated[release_key] = time.time()
+                            new_releases.append(self._make_result({
+                                'title': title,
+                                'link': link,
+                                'seeders': seeders,
+                            }))
+
+            if new_releases:
+                try:
+                    await self.core.search.announce(new_releases)
+                except:
+                    logger.exception('Failed to announce new torrentleech releases:')
 
             ttl = 60 * int(channel.find('ttl').text)
             await asyncio.sleep(ttl)
 
+    @staticmethod
+    def _release_key(metadata):
+        if 'title' not in metadata:
+            return None
+        elif metadata.get('type') == 'episode' and 'season' in metadata:
+            return 'episode', filter_show_name(str(metadata['title'])), str(metadata['season'])
+        elif metadata.get('type') == 'movie' and 'year' in metadata:
+            return 'movie', filter_show_name(str(metadata['title'])), str(metadata['year'])
+        else:
+            return None
+
+    def changed_since(self, backlog_item, timestamp):
+        if isinstance(backlog_item, EpisodeBacklogItem):
+            release_key = self._release_key({
+                'type': 'episode',
+                'title': backlog_item.metadata['show_title'],
+                'season': backlog_item.season,
+            })
+        elif isinstance(backlog_item, MovieBacklogItem):
+            release_key = self._release_key({
+                'type': 'movie',
+                'title': backlog_item.metadata['movie_title'],
+                'year': backlog_item.metadata['year'],
+            })
+        else:
+            return False
+        return self._updated.get(release_key, 0) > timestamp
+
+    async def search_many(self, backlog_items):
+        seasons = {}
+        for backlog_item in backlog_items:
+            if isinstance(backlog_item, EpisodeBacklogItem):
+                seasons.setdefault((backlog_item.object_id, backlog_item.season), []).append(backlog_item)
+
+        results = {}
+        for episodes in seasons.values():
+            if len(episodes) > 1:
+                results.update(await self._search_episodes(episodes))
+
+        remaining = [backlog_item for backlog_item in backlog_items if backlog_item not in results]
+        results.update(zip(remaining, await asyncio.gather(*(self.search(item) for item in remaining))))
+        return results
+
+    async def _search_episodes(self, episodes):
+        by_episode = {str(episode.episode): episode for episode in episodes}
+        results = await self._pool.fetch(
+            '''
+                SELECT *
+                FROM torrentleech
+                WHERE metadata->>'type' = 'episode'
+                AND metadata->>'title' ILIKE $1
+                AND metadata->>'season' = $2
+                AND (metadata->>'episode' = ANY($3::text[]) OR metadata->>'episode' IS NULL)
+            ''',
+            filter_show_name(episodes[0].metadata['show_title']),
+            str(episodes[0].season),
+            list(by_episode),
+        )
+
+        episode_results = {episode: [] for episode in episodes}
+        for result in results:
+            if 'episode' not in result['metadata']:
+                # Season packs are offered for every episode.
+                season_pack = self._make_result(result)
+                for episode in episodes:
+                    episode_results[episode].append(season_pack)
+                continue
+            episode = by_episode.get(str(result['metadata']['episode']))
+            if episode is not None:
+                episode_results[episode].append(self._make_result(result))
+        return episode_results
+
     async def search(self, backlog_item):
         if isinstance(backlog_item, EpisodeBacklogItem):
             results = await self._pool.fetch(
@@ -187,17 +284,17 @@ class TorrentLeechSearchPlugin(SearchPlugin):
         else:
             results = []
 
-        return [
+        return [self._make_result(result) for result in results]
+
+    def _make_result(self, result):
+        return SearchResult(
+            self,
+            result['title'],
             {
-                'origin': self,
-                'verified': True,
-                'rank': result['seeders'],
-                'title': result['title'],
-                'media': {
-                   'torrent:url': {
-                       'url': result['link'],
-                   },
+                'torrent:url': {
+                    'url': result['link'],
                 },
-            }
-            for result in results
-        ]
+            },
+            verified=True,
+            rank=result['seeders'],
+        )
@@ -3,6 +3,8 @@ import itertools
 import json
 import logging
 
+import dateutil.parser
+
 from slurp.backlog import EpisodeBacklogItem, MovieBacklogItem
 from slurp.plugin_types import BackendPlugin, MetadataPlugin
 
@@ -33,7 +35,7 @@ class TraktMetadataPlugin(MetadataPlugin):
 
         try:
             result = await self.backend.trakt_request(
-                'shows/{slug}/seasons/{season}/episodes/{episode}',
+                'shows/{slug}/seasons/{season}/episodes/{episode}?extended=full',
                 {
                     'slug': backlog_item.object_id,
                     'season': backlog_item.season,
@@ -43,7 +45,9 @@ class TraktMetadataPlugin(MetadataPlugin):
         except:
             logger.exception('Failed to retrieve extended episode info:')
         else:
-            backlog_item.metadata['episode_title'] = result['title']
+            backlog_item.episode_title = result['title']
+            if result.get('first_aired'):
+                backlog_item.aired = dateutil.parser.parse(result['first_aired']).timestamp()
 
 
 class PostProcessorPlugin(object):
@@ -270,15 +274,12 @@ class TraktBackendPlugin(BackendPlugin):
             else:
                 return json.loads(response)
 
-    async def _add_or_remove_episode(self, show, season, episode, collected):
+    async def _add_or_remove_episode(self, show, show_metadata, season, episode, collected):
         item = EpisodeBacklogItem(
             show['ids']['slug'],
             season,
             episode,
-            {
-                'ids': show['ids'],
-                'show_title': show['title'],
-            },
+            show_metadata,
         )
         if collected:
             self.core.backlog.remove_item(item)
@@ -286,6 +287,15 @@ class TraktBackendPlugin(BackendPlugin):
             await self.core.backlog.add_item(item)
 
     async def _process_show_progress(self, progress, show, rt_progress):
+        show_metadata = {
+            'ids': show['ids'],
+            'show_title': show['title'],
+            # Keyed by string, the metadata is stored as JSON.
+            'season_episodes': {
+                str(season['number']): len(season['episodes'])
+                for season in progress['seasons']
+            },
+        }
         coros = []
         for season in progress['seasons']:
             season_number = season['number']
@@ -294,6 +304,7 @@ class TraktBackendPlugin(BackendPlugin):
                 episode_number = episode['number']
                 coros.append(self._add_or_remove_episode(
                     show,
+                    show_metadata,
                     season_number,
                     int(episode_number),
                     episode_number in season_progress,
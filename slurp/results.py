@@ -0,0 +1,103 @@
+import heapq
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SearchResult:
+    __slots__ = ('origin', 'title', 'verified', 'rank', 'media', 'resolver', 'info', 'sort_key')
+
+    # Search results used to be plain dicts, plugins may still read these fields by key.
+    _dict_fields = frozenset(['origin', 'title', 'verified', 'rank', 'media'])
+
+    def __init__(self, origin, title, media, *, verified=False, rank=None, resolver=None, info=None):
+        self.origin = origin
+        self.title = title
+        self.media = media
+        self.verified = verified
+        self.rank = rank if rank is not None else 0
+        # Plugins that need extra requests to find the actual media pass placeholder media and a
+        # coroutine function returning the real media, it's only called for results that get downloaded.
+        self.resolver = resolver
+        self.info = info
+        self.sort_key = None
+
+    @classmethod
+    def from_dict(cls, result):
+        return cls(
+            result['origin'],
+            result['title'],
+            result['media'],
+            verified=result.get('verified', False),
+            rank=result.get('rank'),
+        )
+
+    async def resolve(self):
+        if self.resolver is not None:
+            self.media = await self.resolver()
+            self.resolver = None
+        return self.media
+
+    def __getitem__(self, key):
+        if key not in self._dict_fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._dict_fields else default
+
+    def __str__(self):
+        return self.title
+
+
+class Ranking:
+    # Ranks search results by the keys of sort_order, in order of importance. Every key is negated so
+    # the best result has the smallest sort key.
+    def __init__(self, sort_order, plugins):
+        origins = {plugin: index for index, plugin in enumerate(plugins)}
+        unknown_origin = len(plugins)
+
+        self.sort_order = []
+        key_functions = []
+        for key in sort_order:
+            if key == 'verified':
+                key_functions.append(lambda result: -1 if result.verified else 0)
+            elif key == 'origin':
+                key_functions.append(lambda result: origins.get(result.origin, unknown_origin))
+            elif key == 'rank':
+                key_functions.append(lambda result: -result.rank)
+            elif key == 'proper':
+                key_functions.append(lambda result: -result.info.get('proper_count', 0))
+            else:
+                logger.warning('Invalid sort key %s' % key)
+                continue
+            self.sort_order.append(key)
+        self._key_functions = tuple(key_functions)
+
+        # The best sort key each plugin could possibly produce, None for keys without an upper bound.
+        self._bounds = {
+            plugin: tuple(
+                -1 if key == 'verified' else origins[plugin] if key == 'origin' else None
+                for key in self.sort_order
+            )
+            for plugin in plugins
+        }
+
+    def key(self, result):
+        if result.sort_key is None:
+            result.sort_key = tuple(key_function(result) for key_function in self._key_functions)
+        return result.sort_key
+
+    def top(self, results, count):
+        return heapq.nsmallest(count, results, key=self.key)
+
+    def cannot_outrank(self, plugin, key):
+        bounds = self._bounds.get(plugin)
+        if bounds is None:
+            return False
+        for value, bound in zip(key, bounds):
+            if bound is None:
+                return False
+            if value != bound:
+                return value < bound
+        return True
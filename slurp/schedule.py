@@ -0,0 +1,53 @@
+import time
+
+
+class SearchSchedule:
+    min_interval = 900
+    interval = 3600
+    max_interval = 7 * 86400
+    fresh_period = 2 * 86400
+
+    def __init__(self, *, min_interval=None, interval=None, max_interval=None, fresh_period=None):
+        if min_interval is not None:
+            self.min_interval = min_interval
+        if interval is not None:
+            self.interval = interval
+        if max_interval is not None:
+            self.max_interval = max_interval
+        if fresh_period is not None:
+            self.fresh_period = fresh_period
+
+    @staticmethod
+    def has_aired(backlog_item, now=None):
+        if backlog_item.aired is None:
+            return True
+        return (time.time() if now is None else now) >= backlog_item.aired
+
+    def is_fresh(self, backlog_item, now=None):
+        now = time.time() if now is None else now
+        return backlog_item.aired is not None and now - backlog_item.aired < self.fresh_period
+
+    def is_due(self, backlog_item, now=None):
+        now = time.time() if now is None else now
+        return self.has_aired(backlog_item, now) and now >= backlog_item.next_search
+
+    def due(self, backlog_items, now=None):
+        now = time.time() if now is None else now
+        return [
+            backlog_item
+            for backlog_item in backlog_items
+            if self.is_due(backlog_item, now)
+        ]
+
+    def searched(self, backlog_item, now=None):
+        now = time.time() if now is None else now
+
+        if self.is_fresh(backlog_item, now):
+            # Recently aired, keep looking often so we grab it quickly once it's released.
+            interval = self.min_interval
+        else:
+            interval = min(self.max_interval, self.interval * 2 ** backlog_item.search_attempts)
+            if interval < self.max_interval:
+                backlog_item.search_attempts += 1
+
+        backlog_item.next_search = now + interval
@@ -1,12 +1,20 @@
 import asyncio
 import itertools
 import logging
+import time
+from collections import Counter, OrderedDict, deque
 from cidict import cidict
 from configparser import NoSectionError
 
 from slurp.backlog import EpisodeBacklogItem, MovieBacklogItem
+from slurp.filters import FilterChain, reject_values, require_values
+from slurp.metrics import percentiles
+from slurp.pipeline import Stage
 from slurp.plugin_types import SearchPlugin
-from slurp.util import filter_show_name, guess_media_info, parse_option_list, load_plugins
+from slurp.results import Ranking, SearchResult
+from slurp.schedule import SearchSchedule
+from slurp.util import compile_phrase_matcher, media_fingerprints, normalize_url, parse_option_list, \
+    parse_ordered_option_list, load_plugins
 
 DEFAULT_BLACKLIST = 'core2hd,chamee'
 
@@ -15,25 +23,82 @@ logger = logging.getLogger(__name__)
 
 class Search:
     _search_interval = 3600
+    _search_tick = 60
     _start_delay = 300
     _sort_order = ('verified', 'origin', 'rank')
+    _dl_blacklist_ttl = 0
+    _season_pack_ratio = 0.5
+    _negative_ttl = 6 * 3600
+    _search_budget = 120
+    _plugin_timeout = 60
+    _latency_samples = 100
+    _plugin_min_interval = 0
+    _plugin_max_interval = 86400
+    _fallback_candidates = 3
 
     def __init__(self, core, *, loop=None):
         self.core = core
         self.loop = loop if loop is not None else asyncio.get_event_loop()
 
         self._dl_blacklist = {}
+        self._info_hashes = {}
+        self._queued = set()
+        self._supported_media = set()
+        self.rejections = OrderedDict()
+        core.metrics.register('search.rejections', lambda: dict(self.rejections))
+        self._negative_cache = {}
+        self._negative_skipped = 0
+        core.metrics.register('search.negative_cache', lambda: {
+            'size': len(self._negative_cache),
+            'skipped': self._negative_skipped,
+        })
+        self._latencies = {}
+        self._timeouts = {}
+        self._plugin_yield = {}
+        self._plugin_intervals = {}
+        self._plugin_searched = {}
+        core.metrics.register('search.plugins', self._plugin_stats)
+        self._sweep_total = 0
+        self._sweep_done = 0
+        self._sweep_started = None
+        core.metrics.register('search.progress', self._search_progress)
 
+        self.plugin_map = load_plugins('search', SearchPlugin, 0, core, loop=self.loop)
+        self.plugins = list(self.plugin_map.values())
+        self._plugin_names = {plugin: name for name, plugin in self.plugin_map.items()}
+
+        self.load_config()
+
+        self.search_stage = Stage(core, 'search', self._search_queued_items, workers=8, queue_size=1000,
+                                  prioritized=True, loop=self.loop)
+
+    def load_config(self):
         self._filter = {}
         self._require = {}
+        self._plugin_timeouts = {}
 
         blacklist = DEFAULT_BLACKLIST
+        self.schedule = SearchSchedule()
         try:
-            section = dict(core.config.items('slurp.search'))
+            section = dict(self.core.config.items('slurp.search'))
             blacklist = section.get('blacklist', blacklist)
             self._search_interval = int(section.get('interval', self._search_interval))
+            self._search_tick = int(section.get('tick', self._search_tick))
+            self.schedule = SearchSchedule(
+                min_interval=int(section.get('min_interval', SearchSchedule.min_interval)),
+                interval=self._search_interval,
+                max_interval=int(section.get('max_interval', SearchSchedule.max_interval)),
+                fresh_period=int(section.get('fresh_period', SearchSchedule.fresh_period)),
+            )
             self._start_delay = int(section.get('start_delay', self._start_delay))
-            self._sort_order = parse_option_list(section.get('sort_order', ','.join(self._sort_order)))
+            self._dl_blacklist_ttl = int(section.get('dl_blacklist_ttl', self._dl_blacklist_ttl))
+            self._season_pack_ratio = float(section.get('season_pack_ratio', self._season_pack_ratio))
+            self._negative_ttl = int(section.get('negative_ttl', self._negative_ttl))
+            self._search_budget = float(section.get('budget', self._search_budget))
+            self._plugin_timeout = float(section.get('plugin_timeout', self._plugin_timeout))
+            self._plugin_min_interval = int(section.get('plugin_min_interval', self._plugin_min_interval))
+            self._plugin_max_interval = int(section.get('plugin_max_interval', self._plugin_max_interval))
+            self._sort_order = parse_ordered_option_list(section.get('sort_order', ','.join(self._sort_order)))
 
             for key, value in section.items():
                 if key.startswith('filter.'):
@@ -42,17 +107,41 @@ class Search:
                 elif key.startswith('require.'):
                     require_key = key.split('.', 1)[1]
                     self._require[require_key] = parse_option_list(value)
+                elif key.startswith('plugin_timeout.'):
+                    plugin_name = key.split('.', 1)[1]
+                    self._plugin_timeouts[plugin_name] = float(value)
         except NoSectionError:
             pass
         except:
             logger.exception('Invalid search configuration:')
 
-        self._blacklist = parse_option_list(blacklist)
+        self._blacklist = compile_phrase_matcher(parse_option_list(blacklist))
+        self._filters = self._compile_filters()
+        self._season_pack_filters = self._compile_filters(season_pack=True)
+        self.ranking = Ranking(self._sort_order, self.plugins)
+
+    def _compile_filters(self, season_pack=False):
+        filters = FilterChain(self.rejections)
+
+        filters.add('medium', self._has_supported_medium)
+        if self._blacklist is not None:
+            filters.add('blacklist', self._not_blacklisted)
+        filters.add('dl_blacklist', self._not_dl_blacklisted)
+
+        for key, values in self._filter.items():
+            filters.add('filter.{}'.format(key), reject_values(key, values), needs_info=True)
+        for key, values in self._require.items():
+            filters.add('require.{}'.format(key), require_values(key, values), needs_info=True)
+        if season_pack:
+            filters.add('season_pack', self._matches_season_pack, needs_info=True)
+        else:
+            filters.add('info', self._matches_backlog_item, needs_info=True)
 
-        self.plugin_map = load_plugins('search', SearchPlugin, 0, core, loop=self.loop)
-        self.plugins = list(self.plugin_map.values())
+        return filters
 
     async def start(self):
+        self._supported_media = self.core.download.supported_media
+        self._dl_blacklist = self.core.state.get('search.dl_blacklist', {})
         await asyncio.gather(*(plugin.start() for plugin in self.plugins))
 
     async def run(self):
@@ -60,193 +149,532 @@ class Search:
             await asyncio.sleep(self._start_delay)
             while True:
                 await self._search_backlog()
-                await asyncio.sleep(self._search_interval)
+                await asyncio.sleep(self._search_tick)
 
-        await asyncio.gather(loop(), *(plugin.run() for plugin in self.plugins))
+        await asyncio.gather(loop(), self.search_stage.run(), *(plugin.run() for plugin in self.plugins))
 
     async def _search_backlog(self):
         if self.core.backlog.empty():
             logger.info('Not searching backlog, no backlog found')
             return
 
-        await asyncio.gather(*(
-            self.search_backlog_item(backlog_item)
-            for backlog_item in self.core.backlog.values()
-        ))
+        self._prune_plugin_caches()
+
+        groups = OrderedDict()
+        for backlog_item in self.schedule.due(self.core.backlog.values()):
+            if self.core.download.is_downloading(backlog_item):
+                # Stays due until the download completes or fails, don't count it as searched.
+                continue
+            groups.setdefault(self._search_group(backlog_item), []).append(backlog_item)
+
+        # Take turns between shows so a show with many seasons missing doesn't hold up the rest.
+        turns = {}
+        scheduled = []
+        for backlog_items in groups.values():
+            object_id = backlog_items[0].object_id
+            turn = turns[object_id] = turns.get(object_id, -1) + 1
+            scheduled.append((self._search_priority(backlog_items, turn), backlog_items))
+        scheduled.sort(key=lambda priority_items: priority_items[0])
+
+        for priority, backlog_items in scheduled:
+            await self.enqueue_many(backlog_items, priority)
+
+    @staticmethod
+    def _search_group(backlog_item):
+        if isinstance(backlog_item, EpisodeBacklogItem):
+            return backlog_item.kind, backlog_item.object_id, backlog_item.season
+        return backlog_item.kind, backlog_item.index_key()
+
+    def _search_priority(self, backlog_items, turn=0):
+        # Recently aired items first, then round robin between shows.
+        now = time.time()
+        fresh = any(self.schedule.is_fresh(backlog_item, now) for backlog_item in backlog_items)
+        return 0 if fresh else 1, turn
+
+    async def enqueue(self, backlog_item):
+        await self.enqueue_many([backlog_item])
+
+    async def enqueue_many(self, backlog_items, priority=None):
+        backlog_items = [backlog_item for backlog_item in backlog_items if backlog_item not in self._queued]
+        if not backlog_items:
+            return
+        if priority is None:
+            priority = self._search_priority(backlog_items)
+
+        if self._sweep_done >= self._sweep_total:
+            # The previous sweep has finished, start counting a new one.
+            self._sweep_total = self._sweep_done = 0
+            self._sweep_started = time.time()
+        self._sweep_total += len(backlog_items)
+
+        self._queued.update(backlog_items)
+        await self.search_stage.put(backlog_items, priority=priority)
+
+    def _known_missing(self, plugin, backlog_item, now):
+        searched = self._negative_cache.get((plugin, backlog_item))
+        if searched is None or self.schedule.is_fresh(backlog_item, now):
+            # Recently aired items are expected to turn up any moment, keep asking every plugin.
+            return False
+        if now - searched >= self._negative_ttl or plugin.changed_since(backlog_item, searched):
+            del self._negative_cache[plugin, backlog_item]
+            return False
+        self._negative_skipped += 1
+        return True
+
+    def _throttled(self, plugin, backlog_item, now):
+        searched = self._plugin_searched.get((plugin, backlog_item))
+        if searched is None or now - searched >= self._plugin_interval(plugin):
+            return False
+        self._yield_stats(plugin)['skipped'] += 1
+        return True
+
+    def _prune_plugin_caches(self):
+        now = time.time()
+        self._negative_cache = {
+            plugin_item: searched
+            for plugin_item, searched in self._negative_cache.items()
+            if now - searched < self._negative_ttl and self.core.backlog.find(plugin_item[1]) is not None
+        }
+        self._plugin_searched = {
+            plugin_item: searched
+            for plugin_item, searched in self._plugin_searched.items()
+            if now - searched < self._plugin_interval(plugin_item[0]) and
+            self.core.backlog.find(plugin_item[1]) is not None
+        }
+
+    def _search_progress(self):
+        progress = {'searched': self._sweep_done, 'total': self._sweep_total}
+        if 0 < self._sweep_done < self._sweep_total:
+            elapsed = time.time() - self._sweep_started
+            progress['eta'] = int(elapsed / self._sweep_done * (self._sweep_total - self._sweep_done))
+        return progress
+
+    async def _search_queued_items(self, backlog_items):
+        self._queued.difference_update(backlog_items)
+        # Skip items that were removed from the backlog while waiting to be searched.
+        live_items = [
+            backlog_item
+            for backlog_item in backlog_items
+            if self.core.backlog.find(backlog_item) is not None
+        ]
+        try:
+            if live_items:
+                await self.search_backlog_items(live_items)
+        finally:
+            self._sweep_done += len(backlog_items)
+
+    async def search_backlog_items(self, backlog_items):
+        searchable = []
+        for backlog_item in backlog_items:
+            if self.core.download.is_downloading(backlog_item):
+                continue
+            if not self.schedule.has_aired(backlog_item):
+                logger.debug('Not searching for {}, it has not aired yet'.format(backlog_item))
+                continue
+            self.schedule.searched(backlog_item)
+            if self.core.backlog.find(backlog_item) is backlog_item:
+                # Keep the backoff across restarts.
+                self.core.state.add_backlog_item(backlog_item)
+            logger.info('Searching for {}'.format(backlog_item))
+            searchable.append(backlog_item)
+        backlog_items = searchable
+        if not backlog_items:
+            return
+
+        season_pack = self._wants_season_pack(backlog_items)
+        candidates, season_packs, queried = await self._collect_candidates(backlog_items, season_pack)
+        contributions = Counter(
+            result.origin
+            for result in itertools.chain(
+                season_packs,
+                *(item_candidates.values() for item_candidates in candidates.values())
+            )
+        )
+
+        winners = set()
+        if season_packs:
+            results = self._rank_candidates(season_packs)
+            winners.add(results[0].origin)
+            await self._download_result(results, backlog_items[0])
+
+        # Handle items one at a time, a download for one item may cover the next ones as well.
+        for backlog_item in backlog_items:
+            if self.core.download.is_downloading(backlog_item):
+                continue
+            results = self._rank_candidates(candidates[backlog_item].values())
+            if results:
+                winners.add(results[0].origin)
+            await self._download_result(results, backlog_item)
+
+        self._update_plugin_yield(queried, contributions, winners)
+
+    async def _collect_candidates(self, backlog_items, season_pack):
+        done = object()
+        arrivals = asyncio.Queue()
 
-    async def search_backlog_item(self, backlog_item):
         async def search(plugin):
+            searched = time.time()
+            plugin_items = [
+                backlog_item
+                for backlog_item in backlog_items
+                if not self._known_missing(plugin, backlog_item, searched) and
+                not self._throttled(plugin, backlog_item, searched)
+            ]
+            if plugin_items:
+                queried.add(plugin)
+                for backlog_item in plugin_items:
+                    self._plugin_searched[plugin, backlog_item] = searched
+
             try:
-                return await plugin.search(backlog_item)
+                found = set()
+                if plugin_items:
+                    async for backlog_item, result in plugin.search_iter(plugin_items):
+                        if isinstance(result, dict):
+                            result = SearchResult.from_dict(result)
+                        found.add(backlog_item)
+                        arrivals.put_nowait((plugin, backlog_item, result))
+
+                if self._negative_ttl:
+                    for backlog_item in plugin_items:
+                        if backlog_item not in found:
+                            self._negative_cache[plugin, backlog_item] = searched
+            except asyncio.CancelledError:
+                raise
             except:
-                logger.exception('Error while searching {} using {}:'.format(backlog_item, plugin))
-                return []
+                logger.exception('Error while searching {} using {}:'.format(
+                    ', '.join(str(backlog_item) for backlog_item in plugin_items), plugin))
+            finally:
+                arrivals.put_nowait((plugin, None, done))
 
-        if self.core.download.is_downloading(backlog_item):
-            return
+        queried = set()
+        completed = set()
+        candidates = {backlog_item: OrderedDict() for backlog_item in backlog_items}
+        season_packs = OrderedDict() if season_pack else None
 
-        logger.info('Searching for {}'.format(backlog_item))
+        started = self.loop.time()
+        deadlines = {plugin: self._search_deadline(plugin, started) for plugin in self.plugins}
 
-        results = await asyncio.gather(*(search(plugin) for plugin in self.plugins))
-        results = tuple(itertools.chain.from_iterable(results))
-        if not results:
+        pending = set(self.plugins)
+        tasks = {plugin: asyncio.ensure_future(search(plugin), loop=self.loop) for plugin in self.plugins}
+        try:
+            while pending:
+                deadline = min((deadlines[plugin] for plugin in pending if deadlines[plugin] is not None),
+                               default=None)
+                try:
+                    arrived = [await asyncio.wait_for(
+                        arrivals.get(),
+                        None if deadline is None else max(0, deadline - self.loop.time()),
+                    )]
+                except asyncio.TimeoutError:
+                    # Out of time, rank whatever the plugins came up with so far.
+                    arrived = []
+                    now = self.loop.time()
+                    for plugin in [plugin for plugin in pending
+                                   if deadlines[plugin] is not None and deadlines[plugin] <= now]:
+                        logger.warning('Searching {} using {} timed out after {:.1f}s'.format(
+                            ', '.join(str(backlog_item) for backlog_item in backlog_items), plugin, now - started))
+                        tasks[plugin].cancel()
+                        pending.discard(plugin)
+                        completed.add(plugin)
+                        if plugin in queried:
+                            self._record_latency(plugin, now - started, timed_out=True)
+
+                # Take everything that arrived in one go, so titles are still parsed in batches.
+                while not arrivals.empty():
+                    arrived.append(arrivals.get_nowait())
+
+                results = []
+                for plugin, backlog_item, result in arrived:
+                    if result is not done:
+                        results.append((backlog_item, result))
+                    elif plugin in pending:
+                        pending.discard(plugin)
+                        completed.add(plugin)
+                        if plugin in queried:
+                            self._record_latency(plugin, self.loop.time() - started)
+                await self._add_candidates(results, candidates, season_packs, backlog_items[0])
+
+                if pending and season_packs is None and self._is_settled(candidates, pending):
+                    logger.debug('Not waiting for {} any longer, nothing they find can outrank the best results'
+                                 .format(', '.join(str(plugin) for plugin in pending)))
+                    break
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+        # Plugins that were stopped early didn't get the chance to contribute, they don't count as searched.
+        return candidates, list(season_packs.values()) if season_packs else [], queried & completed
+
+    def _search_deadline(self, plugin, started):
+        timeout = self._plugin_timeouts.get(self._plugin_names.get(plugin), self._plugin_timeout)
+        deadlines = [
+            started + limit
+            for limit in (timeout, self._search_budget)
+            if limit > 0
+        ]
+        return min(deadlines) if deadlines else None
+
+    def _record_latency(self, plugin, latency, timed_out=False):
+        name = self._plugin_name(plugin)
+        self._latencies.setdefault(name, deque(maxlen=self._latency_samples)).append(round(latency, 3))
+        if timed_out:
+            self._timeouts[name] = self._timeouts.get(name, 0) + 1
+
+    def _plugin_name(self, plugin):
+        return self._plugin_names.get(plugin, str(plugin))
+
+    def _plugin_interval(self, plugin):
+        return self._plugin_intervals.get(plugin, self._plugin_min_interval)
+
+    def _yield_stats(self, plugin):
+        name = self._plugin_name(plugin)
+        stats = self._plugin_yield.get(name)
+        if stats is None:
+            stats = self._plugin_yield[name] = OrderedDict(searches=0, results=0, wins=0, skipped=0)
+        return stats
+
+    def _update_plugin_yield(self, queried, contributions, winners):
+        # Plugins that win grabs are asked more often, plugins that only find what the others already
+        # found (or nothing while the others did) are asked less often.
+        for plugin in queried | winners:
+            stats = self._yield_stats(plugin)
+            interval = self._plugin_interval(plugin)
+            if plugin in queried:
+                stats['searches'] += 1
+                stats['results'] += contributions[plugin]
+            if plugin in winners:
+                stats['wins'] += 1
+                interval /= 2
+                if interval < self.schedule.min_interval:
+                    interval = self._plugin_min_interval
+            elif contributions and not contributions[plugin]:
+                interval = max(interval * 2, self.schedule.min_interval)
+            self._plugin_intervals[plugin] = max(self._plugin_min_interval, min(self._plugin_max_interval, interval))
+
+    def _plugin_stats(self):
+        names = list(self._plugin_yield) + [name for name in self._latencies if name not in self._plugin_yield]
+        plugins = {name: plugin for plugin, name in self._plugin_names.items()}
+        return {
+            name: dict(
+                self._plugin_yield.get(name, {}),
+                interval=int(self._plugin_interval(plugins.get(name))),
+                timeouts=self._timeouts.get(name, 0),
+                **percentiles(self._latencies.get(name, ()))
+            )
+            for name in names
+        }
+
+    async def _add_candidates(self, results, candidates, season_packs, first_item):
+        # Candidates are keyed by release, a release that was already found for the item is skipped.
+        accepted = []
+        for backlog_item, result in results:
+            key = self._release_key(result)
+            if key not in candidates[backlog_item] and self._filters.accepts(result, backlog_item):
+                accepted.append((backlog_item, key, result))
+
+        packs = []
+        if season_packs is not None:
+            for _, result in results:
+                key = self._release_key(result)
+                if key not in season_packs and self._season_pack_filters.accepts(result, first_item):
+                    season_packs[key] = None
+                    packs.append((key, result))
+
+        if not accepted and not packs:
             return
-        results = tuple(self._filter_by_medium(results, self.core.download.supported_media))
-        results = tuple(self._filter_blacklist(results))
-        results = tuple(self._filter_dl_blacklist(results))
-        results = tuple(self._guess_media_info(results))
-        results = tuple(self._filter_by_info(results, backlog_item))
-        results = tuple(self._filter_by_config(results))
-        results = tuple(self._sort_search_results(results))
-        await self._download_result(results, backlog_item)
-
-    def _filter_by_medium(self, results, supported_media):
-        return filter(lambda result: set(result['media']) & supported_media, results)
-
-    def _filter_blacklist(self, results):
-        return filter(
-            lambda result: not any([
-                phrase in result['title'].lower()
-                for phrase in self._blacklist
-            ]),
-            results
-        )
 
-    def _filter_dl_blacklist(self, results):
-        return filter(
-            lambda result: not any([
-                data == dl
-                for medium, data in result['media'].items()
-                for dl in self._dl_blacklist.get(medium, [])
-            ]),
-            results
+        await self._guess_media_info([result for _, _, result in accepted] + [result for _, result in packs])
+        for backlog_item, key, result in accepted:
+            if self._filters.accepts_info(result, result.info, backlog_item):
+                candidates[backlog_item].setdefault(key, result)
+        for key, result in packs:
+            if self._season_pack_filters.accepts_info(result, result.info, first_item):
+                season_packs[key] = result
+            else:
+                del season_packs[key]
+
+    def _release_key(self, result):
+        fingerprints = media_fingerprints(result.media, self._info_hashes)
+        info_hashes = [fingerprint for fingerprint in fingerprints if fingerprint.startswith('btih:')]
+        return min(info_hashes or fingerprints)
+
+    def _is_settled(self, candidates, pending):
+        for item_candidates in candidates.values():
+            if not item_candidates:
+                return False
+            best = min(self.ranking.key(result) for result in item_candidates.values())
+            if not all(self.ranking.cannot_outrank(plugin, best) for plugin in pending):
+                return False
+        return True
+
+    def _wants_season_pack(self, backlog_items):
+        # The plugins only send season queries for groups of several episodes, a single episode query
+        # won't turn up any packs.
+        if self._season_pack_ratio <= 0 or len(backlog_items) < 2:
+            return False
+
+        first = backlog_items[0]
+        if not isinstance(first, EpisodeBacklogItem) or \
+                any(self._search_group(backlog_item) != self._search_group(first) for backlog_item in backlog_items):
+            return False
+
+        missing = self.core.backlog.episodes(first.object_id, first.season)
+        if len(missing) < 2:
+            return False
+        season_size = max(
+            first.metadata.get('season_episodes', {}).get(str(first.season), 0),
+            max(backlog_item.episode for backlog_item in missing),
         )
-
-    def _guess_media_info(self, results):
-        return [
-            (
-                result,
-                cidict(guess_media_info(result['title'])),
-            )
+        return len(missing) >= self._season_pack_ratio * season_size
+
+    def _has_supported_medium(self, result, info, backlog_item):
+        return not self._supported_media.isdisjoint(result.media)
+
+    def _not_blacklisted(self, result, info, backlog_item):
+        return not self._blacklist.search(result.title.lower())
+
+    def _not_dl_blacklisted(self, result, info, backlog_item):
+        now = time.time()
+        for fingerprint in media_fingerprints(result.media, self._info_hashes):
+            if fingerprint in self._dl_blacklist:
+                expires = self._dl_blacklist[fingerprint]
+                if expires is None or expires > now:
+                    return False
+                del self._dl_blacklist[fingerprint]
+        return True
+
+    def _add_to_dl_blacklist(self, *media):
+        now = time.time()
+        expires = now + self._dl_blacklist_ttl if self._dl_blacklist_ttl else None
+        for fingerprint in set().union(*(media_fingerprints(m, self._info_hashes) for m in media)):
+            self._dl_blacklist[fingerprint] = expires
+
+        self._dl_blacklist = {
+            fingerprint: expires
+            for fingerprint, expires in self._dl_blacklist.items()
+            if expires is None or expires > now
+        }
+        self.core.state.set('search.dl_blacklist', self._dl_blacklist)
+
+    async def announce(self, results):
+        # Called by search plugins with releases they just found, matching backlog items are grabbed right
+        # away instead of waiting for the next sweep.
+        results = [
+            SearchResult.from_dict(result) if isinstance(result, dict) else result
             for result in results
         ]
+        matched = OrderedDict()
+        for result in await self._guess_media_info(results):
+            for backlog_item in self.core.backlog.matcher.match(result.info):
+                if not self.core.download.is_downloading(backlog_item):
+                    matched.setdefault(backlog_item, []).append(result)
+        if not matched:
+            return
 
-    def _filter_by_info(self, results, backlog_item):
-        if isinstance(backlog_item, EpisodeBacklogItem):
-            show_info = guess_media_info(backlog_item.metadata['show_title'] + ' S01E01')
-            show_title = filter_show_name(show_info['title'])
-            season = backlog_item.season
-            episode = backlog_item.episode
-
-            return [
-                (result, info)
-                for result, info in results
-                if
-                (
-                        'title' in info and filter_show_name(info['title']) == show_title
-                        and ('year' not in show_info or show_info['year'] == info.get('year'))
-                        and ('country' not in show_info or show_info['country'] == info.get('country'))
-                        and 'season' in info and info['season'] == season
-                        and 'episode' in info and episode in info['episode']
-                )
-            ]
-        elif isinstance(backlog_item, MovieBacklogItem):
-            movie_info = guess_media_info(backlog_item.metadata['movie_title'], movie=True)
-            movie_title = filter_show_name(movie_info['title'])
-            year = backlog_item.metadata['year']
-
-            return [
-                (result, info)
-                for result, info in results
-                if
-                (
-                    'title' in info and filter_show_name(info['title']) == movie_title
-                    and year == info.get('year')
-                )
-            ]
-        else:
-            return []
-
-    def _filter_by_config(self, results):
-        def set_from_value_or_list(value):
-            if not isinstance(value, list):
-                value = [value]
-            return set([str(v).lower() for v in value])
-
-        return [
-            (result, info)
-            for result, info in results
-            if
-            (
-                (
-                    not any([
-                        (value & set_from_value_or_list(info.get(key, 'unknown')))
-                        for key, value in self._filter.items()
-                    ])
-                )
-                and
-                (
-                    all([
-                        (value & set_from_value_or_list(info.get(key, 'unknown')))
-                        for key, value in self._require.items()
-                    ])
-                )
-            )
-        ]
-
-    def _sort_search_results(self, results):
-        def sort_key_item(result, info, key):
-            if key == 'verified':
-                return result['verified'] and 1 or 0
-            elif key == 'origin':
-                return -self.plugins.index(result['origin'])
-            elif key == 'rank':
-                return result['rank']
-            elif key == 'proper':
-                return info.get('proper_count', 0)
-            else:
-                logger.warning('Invalid sort key %s' % key)
-                return 0
-
-        def sort_key(result_info):
-            result, info = result_info
-            return tuple(
-                -sort_key_item(result, info, key)
-                for key in self._sort_order
-            )
+        candidates = {backlog_item: OrderedDict() for backlog_item in matched}
+        await self._add_candidates([
+            (backlog_item, result)
+            for backlog_item, item_results in matched.items()
+            for result in item_results
+        ], candidates, None, None)
+
+        winners = set()
+        for backlog_item in matched:
+            if self.core.download.is_downloading(backlog_item):
+                continue
+            results = self._rank_candidates(candidates[backlog_item].values())
+            if results:
+                logger.info('Found {} in newly announced releases'.format(backlog_item))
+                winners.add(results[0].origin)
+            await self._download_result(results, backlog_item)
+        self._update_plugin_yield(set(), Counter(), winners)
+
+    def learn_info_hash(self, url, info_hash):
+        # Called by download plugins once they fetched a .torrent file.
+        url = normalize_url(url)
+        info_hash = info_hash.lower()
+        self._info_hashes[url] = info_hash
+
+        url_fingerprint = 'url:{}'.format(url)
+        if url_fingerprint in self._dl_blacklist:
+            self._dl_blacklist['btih:{}'.format(info_hash)] = self._dl_blacklist[url_fingerprint]
+            self.core.state.set('search.dl_blacklist', self._dl_blacklist)
+
+    def _matches_backlog_item(self, result, info, backlog_item):
+        return backlog_item in self.core.backlog.matcher.match(info)
+
+    def _matches_season_pack(self, result, info, backlog_item):
+        return backlog_item in self.core.backlog.matcher.match_season(info)
+
+    async def _guess_media_info(self, results):
+        infos = await self.core.workers.guess_media_info([result.title for result in results])
+        for result, info in zip(results, infos):
+            result.info = cidict(info)
+        return results
+
+    def _rank_candidates(self, results):
+        # The best candidate first, followed by a few fallbacks in order.
+        return self.ranking.top(results, 1 + self._fallback_candidates)
+
+    async def _resolve_media(self, result, candidates):
+        # Returns the placeholder media the result was found with, or None if it can't be downloaded.
+        found_media = result.media
+        if result.resolver is None:
+            return found_media
 
-        return sorted(
-            results,
-            key=sort_key,
-        )
+        try:
+            await result.resolve()
+        except:
+            logger.exception('Failed to resolve media for {} from {}:'.format(result, result.origin))
+            return None
+
+        if not self._not_dl_blacklisted(result, result.info, None):
+            # Only now recognizable as something we downloaded before, don't resolve it again.
+            self._add_to_dl_blacklist(found_media)
+            return None
+
+        # The placeholder had no info hash, so twins among the other candidates could only be recognized now.
+        # Offer their media as well, which also puts them on the download blacklist with this result.
+        key = self._release_key(result)
+        for candidate in candidates:
+            if candidate is not result and candidate.resolver is None and self._release_key(candidate) == key:
+                result.media = {**candidate.media, **result.media}
+        return found_media
 
     async def _download_result(self, results, original_backlog_item):
-        if not results:
+        # Candidates are tried in order, falling back to the next one if its media can't be resolved.
+        for result in results:
+            found_media = await self._resolve_media(result, results)
+            if found_media is not None:
+                break
+        else:
             return
 
-        result, info = results[0]
+        info = result.info
 
         if isinstance(original_backlog_item, EpisodeBacklogItem):
             season = original_backlog_item.season
 
-            for medium, data in result['media'].items():
-                self._dl_blacklist.setdefault(
-                    medium,
-                    []
-                ).append(data)
-
-            episode_list = info['episode']
-
-            backlog_items = []
-            for episode in episode_list:
-                placeholder = EpisodeBacklogItem(original_backlog_item.object_id, season, episode,
-                                                 original_backlog_item.metadata)
-                backlog_item = self.core.backlog.find(placeholder)
-                if backlog_item is not None:
-                    backlog_items.append(backlog_item)
+            self._add_to_dl_blacklist(found_media, result.media)
+
+            if 'episode' in info:
+                backlog_items = []
+                for episode in info['episode']:
+                    placeholder = EpisodeBacklogItem(original_backlog_item.object_id, season, episode,
+                                                     original_backlog_item.metadata)
+                    backlog_item = self.core.backlog.find(placeholder)
+                    if backlog_item is not None:
+                        backlog_items.append(backlog_item)
+            else:
+                # A season pack covers every episode of the season in the backlog.
+                backlog_items = sorted((
+                    backlog_item
+                    for backlog_item in self.core.backlog.matcher.match_season(info)
+                    if backlog_item.object_id == original_backlog_item.object_id
+                ), key=lambda backlog_item: backlog_item.episode)
         elif isinstance(original_backlog_item, MovieBacklogItem):
             backlog_items = [original_backlog_item]
         else:
             return
 
-        return await self.core.download.download(backlog_items, result)
+        return await self.core.download.enqueue(backlog_items, result)
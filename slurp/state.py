@@ -0,0 +1,70 @@
+import asyncio
+import json
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+class State:
+    _checkpoint_delay = 1.0
+
+    def __init__(self, path, *, loop=None):
+        self.loop = loop if loop is not None else asyncio.get_event_loop()
+        self._checkpoint_handle = None
+
+        self._db = sqlite3.connect(path)
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS backlog (
+                ref text NOT NULL PRIMARY KEY,
+                state text NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS state (
+                name text NOT NULL PRIMARY KEY,
+                value text NOT NULL
+            );
+        ''')
+        self._db.commit()
+
+    def get(self, name, default=None):
+        row = self._db.execute('SELECT value FROM state WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def set(self, name, value):
+        self._db.execute(
+            'INSERT OR REPLACE INTO state (name, value) VALUES (?, ?)',
+            (name, json.dumps(value)),
+        )
+        self._changed()
+
+    def backlog_items(self):
+        for ref, state in self._db.execute('SELECT ref, state FROM backlog'):
+            yield json.loads(ref), json.loads(state)
+
+    def add_backlog_item(self, item):
+        self._db.execute(
+            'INSERT OR REPLACE INTO backlog (ref, state) VALUES (?, ?)',
+            (json.dumps(item.ref()), json.dumps(item.state())),
+        )
+        self._changed()
+
+    def remove_backlog_item(self, item):
+        self._db.execute('DELETE FROM backlog WHERE ref = ?', (json.dumps(item.ref()),))
+        self._changed()
+
+    def _changed(self):
+        # Batch bursts of changes (f.e. a backlog sync) into a single transaction.
+        if self._checkpoint_handle is None:
+            self._checkpoint_handle = self.loop.call_later(self._checkpoint_delay, self.checkpoint)
+
+    def checkpoint(self):
+        if self._checkpoint_handle is not None:
+            self._checkpoint_handle.cancel()
+            self._checkpoint_handle = None
+
+        try:
+            self._db.commit()
+        except:
+            logger.exception('Failed to checkpoint state:')
@@ -1,10 +1,16 @@
+import base64
+import binascii
 import configparser
+import json
+import urllib.parse
 from collections import OrderedDict
 
 import operator
+import pickle
 import pkg_resources
 import re
 import logging
+import sqlite3
 
 import guessit
 
@@ -16,6 +22,54 @@ FILTER_STRIP_CHARS = re.compile(r'["()\[\]]')
 FILTER_SPACE_CHARS = re.compile(r'[\'-.,_+:]')
 FILTER_MULTIPLE_SPACES = re.compile(r'\s+')
 
+SCENE_EPISODE_NAME = re.compile(
+    r'^(?P<title>[A-Za-z]+(?:[. ][A-Za-z]+)*?)'
+    r'(?:[. ](?P<year>(?:19|20)\d\d))?'
+    r'[. ]S(?P<season>\d{1,2})(?P<episodes>(?:E\d{1,3})+)'
+    r'(?P<tags>(?:[. ][A-Za-z0-9]+(?:-[Dd][Ll])?)*?)'
+    r'(?:-(?P<release_group>[A-Za-z0-9]+))?$'
+)
+SCENE_MOVIE_NAME = re.compile(
+    r'^(?P<title>[A-Za-z]+(?:[. ][A-Za-z]+)*?)'
+    r'[. ](?P<year>(?:19|20)\d\d)'
+    r'(?P<tags>(?:[. ][A-Za-z0-9]+(?:-[Dd][Ll])?)+?)'
+    r'(?:-(?P<release_group>[A-Za-z0-9]+))?$'
+)
+SCENE_EPISODE_NUMBER = re.compile(r'E(\d+)')
+SCENE_TAG_SEPARATOR = re.compile(r'[. ]')
+SCENE_TAGS = {
+    '480p': (('screen_size', '480p'),),
+    '576p': (('screen_size', '576p'),),
+    '720p': (('screen_size', '720p'),),
+    '1080p': (('screen_size', '1080p'),),
+    '1080i': (('screen_size', '1080i'),),
+    '2160p': (('screen_size', '2160p'),),
+    'hdtv': (('source', 'HDTV'),),
+    'web': (('source', 'Web'),),
+    'web-dl': (('source', 'Web'),),
+    'webrip': (('source', 'Web'), ('other', 'Rip')),
+    'bluray': (('source', 'Blu-ray'),),
+    'dvdrip': (('source', 'DVD'), ('other', 'Rip')),
+    'x264': (('video_codec', 'H.264'),),
+    'h264': (('video_codec', 'H.264'),),
+    'x265': (('video_codec', 'H.265'),),
+    'hevc': (('video_codec', 'H.265'), ('video_profile', 'High Efficiency Video Coding')),
+    'xvid': (('video_codec', 'Xvid'),),
+    'aac': (('audio_codec', 'AAC'),),
+    'internal': (('other', 'Internal'),),
+    'proper': (('other', 'Proper'), ('proper_count', 1)),
+    'repack': (('other', 'Proper'), ('proper_count', 1)),
+    'real': (('other', 'Proper'), ('proper_count', 1)),
+}
+# Title words guessit may interpret as a property, let guessit handle those. Streaming service tags are left
+# to guessit as well, whether it reports them depends on the tags around them.
+SCENE_UNSAFE_TITLE_WORDS = frozenset(SCENE_TAGS) | frozenset([
+    'amzn', 'nf', 'dsnp', 'hmax', 'hulu', 'atvp',
+    'us', 'uk', 'au', 'nz', 'ca', 'part', 'vol', 'pt', 'extended', 'complete', 'limited', 'dubbed', 'subbed',
+    'multi', 'english', 'french', 'german', 'spanish', 'italian', 'dutch', 'swedish', 'nordic', 'hebrew',
+    'russian', 'hindi', 'korean', 'japanese', 'chinese', 'vostfr', 'season', 'episode', 'ep', 'hd', 'sd',
+])
+
 
 def filter_show_name(title):
     global FILTER_SPACE_CHARS, FILTER_STRIP_CHARS, FILTER_MULTIPLE_SPACES
@@ -31,8 +85,188 @@ def filter_show_name(title):
     ).strip()
 
 
+class GuessCache:
+    maxsize = 10000
+    max_disk_entries = 1000000
+    _commit_every = 100
+
+    def __init__(self):
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._db = None
+        self._pending_writes = 0
+
+    def configure(self, *, maxsize=None, path=None, max_disk_entries=None):
+        if maxsize is not None:
+            self.maxsize = maxsize
+        if max_disk_entries is not None:
+            self.max_disk_entries = max_disk_entries
+
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+        if path:
+            self._db = sqlite3.connect(path)
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS media_info (
+                    title text NOT NULL,
+                    movie integer NOT NULL,
+                    info blob NOT NULL,
+                    PRIMARY KEY (title, movie)
+                )
+            ''')
+            self._db.commit()
+
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def get(self, title, movie):
+        key = (title, movie)
+        info = self._cache.get(key)
+        if info is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return info
+
+        if self._db is not None:
+            row = self._db.execute(
+                'SELECT info FROM media_info WHERE title = ? AND movie = ?',
+                (title, movie),
+            ).fetchone()
+            if row is not None:
+                info = pickle.loads(row[0])
+                self._remember(key, info)
+                self.disk_hits += 1
+                return info
+
+        self.misses += 1
+        return None
+
+    def put(self, title, movie, info):
+        self._remember((title, movie), info)
+
+        if self._db is not None:
+            self._db.execute(
+                'INSERT OR REPLACE INTO media_info (title, movie, info) VALUES (?, ?, ?)',
+                (title, movie, pickle.dumps(info)),
+            )
+            self._pending_writes += 1
+            if self._pending_writes >= self._commit_every:
+                self.flush()
+
+    def flush(self):
+        if self._db is None or not self._pending_writes:
+            return
+
+        self._pending_writes = 0
+        try:
+            self._db.execute(
+                'DELETE FROM media_info WHERE rowid <= (SELECT MAX(rowid) FROM media_info) - ?',
+                (self.max_disk_entries,),
+            )
+            self._db.commit()
+        except:
+            logger.exception('Failed to write media info cache:')
+
+    def stats(self):
+        return {
+            'size': len(self._cache),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+        }
+
+    def _remember(self, key, info):
+        self._cache[key] = info
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+
+guess_cache = GuessCache()
+
+
 def guess_media_info(title, *, movie=False):
+    info = guess_cache.get(title, movie)
+    if info is None:
+        info = parse_media_info(title, movie=movie)
+        guess_cache.put(title, movie, info)
+    # Hand out copies, the cached entry is shared.
+    return dict(info)
+
+
+def parse_scene_name(title):
+    # Fast path for well-formed scene release names. Returns None if any part of the name is not
+    # understood, in which case the caller should fall back to guessit.
+    m = SCENE_EPISODE_NAME.match(title)
+    if m is not None:
+        info = {'type': 'episode'}
+    else:
+        m = SCENE_MOVIE_NAME.match(title)
+        if m is None:
+            return None
+        info = {'type': 'movie'}
+
+    title_words = SCENE_TAG_SEPARATOR.split(m.group('title'))
+    for word in title_words:
+        if word.lower() in SCENE_UNSAFE_TITLE_WORDS or (word.isupper() and len(word) <= 3):
+            return None
+    info['title'] = ' '.join(title_words)
+
+    if m.group('year'):
+        info['year'] = int(m.group('year'))
+
+    if info['type'] == 'episode':
+        info['season'] = int(m.group('season'))
+        info['episode'] = [int(episode) for episode in SCENE_EPISODE_NUMBER.findall(m.group('episodes'))]
+
+    tags = SCENE_TAG_SEPARATOR.split(m.group('tags'))[1:]
+    if info['type'] == 'movie' and tags[0].lower() in ('x264', 'x265'):
+        # guessit reads the year and codec as a resolution (f.e. 2019x264).
+        return None
+    if not m.group('release_group') and tags and tags[-1].lower() == 'aac':
+        # guessit takes a trailing .aac for a file extension.
+        return None
+    for i, tag in enumerate(tags):
+        properties = SCENE_TAGS.get(tag.lower())
+        if properties is None:
+            return None
+        if tag.lower() == 'real' and (i + 1 == len(tags) or tags[i + 1].lower() not in ('proper', 'repack')):
+            return None
+
+        for key, value in properties:
+            if key == 'proper_count':
+                info[key] = info.get(key, 0) + value
+            elif key not in info:
+                info[key] = value
+            elif key != 'other':
+                # Repeated properties are resolved by guessit depending on their position.
+                return None
+            elif info[key] != value and not (isinstance(info[key], list) and value in info[key]):
+                if not isinstance(info[key], list):
+                    info[key] = [info[key]]
+                info[key].append(value)
+
+    if info.get('source') == 'Blu-ray' and info.get('screen_size') == '2160p':
+        # guessit calls this Ultra HD Blu-ray.
+        return None
+
+    if m.group('release_group'):
+        info['release_group'] = m.group('release_group')
+
+    return info
+
+
+def parse_media_info(title, *, movie=False):
     if not movie:
+        info = parse_scene_name(title)
+        if info is not None:
+            return info
+
         try:
             info = guessit.guessit(title)
         except:
@@ -40,6 +274,7 @@ def guess_media_info(title, *, movie=False):
             return {}
         else:
             if 'title' in info:
+                info = dict(info)
                 if isinstance(info.get('episode'), int):
                     info['episode'] = [info['episode']]
                 return info
@@ -50,7 +285,50 @@ def guess_media_info(title, *, movie=False):
         logger.error('guessit failed to guess {}:'.format(title))
         return {}
     else:
-        return info
+        return dict(info)
+
+
+def parse_media_info_batch(titles, movie=False):
+    return [parse_media_info(title, movie=movie) for title in titles]
+
+
+def magnet_info_hash(magnet_uri):
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(magnet_uri).query)
+    for urn in query.get('xt', []):
+        if urn.lower().startswith('urn:btih:'):
+            info_hash = urn[9:]
+            if len(info_hash) == 32:
+                try:
+                    info_hash = binascii.hexlify(base64.b32decode(info_hash.upper())).decode('ascii')
+                except (binascii.Error, ValueError):
+                    return None
+            return info_hash.lower()
+    return None
+
+
+def normalize_url(url):
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+    return urllib.parse.urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+def media_fingerprints(media, info_hashes=None):
+    # info_hashes maps normalized .torrent urls to the info hash of the torrent they serve.
+    fingerprints = set()
+    for medium, data in media.items():
+        info_hash = None
+        if medium == 'torrent:magnet' and 'magnetURI' in data:
+            info_hash = magnet_info_hash(data['magnetURI'])
+        if info_hash is not None:
+            fingerprints.add('btih:{}'.format(info_hash))
+        elif 'url' in data:
+            url = normalize_url(data['url'])
+            fingerprints.add('url:{}'.format(url))
+            if info_hashes and url in info_hashes:
+                fingerprints.add('btih:{}'.format(info_hashes[url]))
+        else:
+            fingerprints.add('{}:{}'.format(medium, json.dumps(data, sort_keys=True)))
+    return fingerprints
 
 
 def parse_option_list(s):
@@ -62,6 +340,47 @@ def parse_option_list(s):
     ])
 
 
+def parse_ordered_option_list(s):
+    return list(OrderedDict.fromkeys(
+        phrase for phrase in [
+            phrase.strip().lower()
+            for phrase in s.split(',')
+        ] if phrase
+    ))
+
+
+def _trie_pattern(trie):
+    if '' in trie and len(trie) == 1:
+        return ''
+
+    alternatives = []
+    for char in sorted(key for key in trie if key):
+        alternatives.append(re.escape(char) + _trie_pattern(trie[char]))
+
+    if len(alternatives) == 1 and '' not in trie:
+        pattern = alternatives[0]
+    else:
+        pattern = '(?:' + '|'.join(alternatives) + ')'
+    if '' in trie:
+        pattern += '?'
+    return pattern
+
+
+def compile_phrase_matcher(phrases):
+    # Build a single regex from a prefix trie of the phrases, so a title is scanned in one pass
+    # without trying every phrase at every position.
+    if not phrases:
+        return None
+
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = None
+    return re.compile(_trie_pattern(trie))
+
+
 def load_plugins(section_name, abc, default_priority, core, *args, **kwargs):
     config_section = {}
     try:
@@ -0,0 +1,74 @@
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from configparser import NoSectionError
+
+from slurp.util import guess_cache, parse_media_info_batch
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    _workers = 0
+    _batch_size = 32
+
+    def __init__(self, core, *, loop=None):
+        self.core = core
+        self.loop = loop if loop is not None else asyncio.get_event_loop()
+        self._executor = None
+
+        try:
+            section = dict(core.config.items('slurp'))
+            self._workers = int(section.get('workers', self._workers))
+            self._batch_size = int(section.get('parse_batch_size', self._batch_size))
+        except NoSectionError:
+            pass
+        except:
+            logger.exception('Invalid worker configuration:')
+
+        if self._workers > 0:
+            self._executor = ProcessPoolExecutor(self._workers)
+
+        core.metrics.register('workers.processes', lambda: self._workers)
+
+    async def call(self, fn, *args):
+        # fn and its arguments must be picklable when running in worker processes.
+        if self._executor is None:
+            return fn(*args)
+        return await self.loop.run_in_executor(self._executor, fn, *args)
+
+    async def guess_media_info(self, titles, *, movie=False):
+        infos = [guess_cache.get(title, movie) for title in titles]
+
+        missing = list(OrderedDict.fromkeys(
+            title
+            for title, info in zip(titles, infos)
+            if info is None
+        ))
+        if missing:
+            batches = [
+                missing[i:i + self._batch_size]
+                for i in range(0, len(missing), self._batch_size)
+            ]
+            parsed = itertools.chain.from_iterable(await asyncio.gather(*(
+                self.call(parse_media_info_batch, batch, movie)
+                for batch in batches
+            )))
+            parsed = dict(zip(missing, parsed))
+            for title, info in parsed.items():
+                guess_cache.put(title, movie, info)
+
+            infos = [
+                parsed[title] if info is None else info
+                for title, info in zip(titles, infos)
+            ]
+
+        # Hand out copies, the cached entries are shared.
+        return [dict(info) for info in infos]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,103 @@
+import guessit
+import pytest
+
+from slurp.util import parse_scene_name
+
+# parse_scene_name must either give up or agree with guessit on every name.
+SCENE_NAMES = [
+    'Show.Name.S01E02.720p.HDTV.x264-GRP',
+    'Show.Name.S01E02.720p.HDTV.x264',
+    'Show.Name.S01E02.720p.hdtv.x264-grp',
+    'Show Name S01E02 720p HDTV x264-GRP',
+    'Show.Name.S1E2.720p.HDTV.x264-GRP',
+    'Show.Name.S01E002.720p.HDTV.x264-GRP',
+    'Show.Name.S01E02E03.720p.WEB-DL.x264-GRP',
+    'Show.Name.S01E02.HDTV.x264-GRP',
+    'Show.Name.S01E02.XviD-GRP',
+    'Show.Name.S01E02.DVDRip.XviD-GRP',
+    'Show.Name.S01E02.480p.HDTV.x264-GRP',
+    'Show.Name.S01E02.576p.HDTV.x264-GRP',
+    'Show.Name.S01E02.1080i.HDTV.x264-GRP',
+    'Show.Name.S01E02.720p.HDTV.x265-GRP',
+    'Show.Name.S01E02.2160p.WEB.HEVC-GRP',
+    'Show.Name.S01E02.720p.WEB.h264-GRP',
+    'Show.Name.S01E02.WEB.x264-GRP',
+    'Show.Name.S01E02.Web-DL.x264-GRP',
+    'Show.Name.S01E02.WEBRip.x264-GRP',
+    'Show.Name.S01E02.720p.BluRay.x264-GRP',
+    'Show.Name.S01E02.720p.HDTV.AAC.x264-GRP',
+    'Show.Name.S01E02.PROPER.720p.HDTV.x264-GRP',
+    'Show.Name.S01E02.REPACK.720p.HDTV.x264-GRP',
+    'Show.Name.S01E02.REAL.PROPER.720p.HDTV.x264-GRP',
+    'Show.Name.S01E02.REAL.REPACK.720p.HDTV.x264-GRP',
+    'Show.Name.S01E02.PROPER.REPACK.720p.HDTV.x264-GRP',
+    'Show.Name.S01E02.INTERNAL.720p.HDTV.x264-GRP',
+    'Show.Name.S01E02.720p.HDTV.x264-KILLERS',
+    'Show.Name.S01E02.720p.HDTV.x264-GRP-Scrambled',
+    'Show.Name.1080p.S01E02.x264-GRP',
+    'Show.Name.S01E02.1080p.AMZN.WEB-DL.DDP5.1.H264-GRP',
+    'Show.Name.S01E02.1080p.AMZN.WEBRip.x264-GRP',
+    'Show.Name.S01E02.1080p.AMZN.WEB.x264-GRP',
+    'Show.Name.S01E02.1080p.NF.WEB.x264-GRP',
+    'Show.Name.S01E02.1080p.NF.WEBRip.x265.HEVC-GRP',
+    'Show.Name.S01E02.720p.NF-GRP',
+    'Show.Name.S01E02.2160p.BluRay.x265-GRP',
+    'Dark.S01E02.720p.NF.WEB.x264-GRP',
+    'Lost.S01E02.720p.HDTV.x264-GRP',
+    'Mr.Robot.S01E02.720p.HDTV.x264-GRP',
+    'The.Flash.S01E02.720p.HDTV.x264-GRP',
+    'The.Office.US.S01E01.720p.HDTV.x264-GRP',
+    'The.100.S01E02.720p.HDTV.x264-GRP',
+    'This.Is.Us.S01E02.720p.HDTV.x264-GRP',
+    'Top.Gear.S01E02.720p.HDTV.x264-GRP',
+    'Young.Sheldon.S01E02.720p.HDTV.x264-GRP',
+    'Once.Upon.a.Time.S01E02.720p.HDTV.x264-GRP',
+    'House.of.Cards.S01E02.720p.WEBRip.x264-GRP',
+    'Marvels.Agents.of.S.H.I.E.L.D.S01E02.720p.HDTV.x264-GRP',
+    'Doctor.Who.2005.S10E01.720p.HDTV.x264-GRP',
+    'Castle.2009.S01E02.720p.HDTV.x264-GRP',
+    'Movie.Name.2019.1080p.BluRay.x264-GRP',
+    'Movie.Name.2019.720p.WEB-DL.AAC.x264-GRP',
+    'Movie.Name.2019.1080p.NF.WEB-DL.AAC.x264-GRP',
+    'Movie.Name.2019.REPACK.1080p.BluRay.x264-GRP',
+    'Movie.Name.2019.PROPER.REPACK.1080p.BluRay.x264-GRP',
+    'Movie.Name.2019.720p.HDTV.x264',
+    'Movie.Name.2019.2160p.BluRay.x265-GRP',
+    'Movie.Name.2019.x264-GRP',
+    'Movie.Name.2019.x265.1080p-GRP',
+    'Movie.Name.2019.720p.AAC',
+    'Movie.Name.1999.DVDRip.XviD-GRP',
+    'Movie.2019.1080p.WEB-DL.x264-GRP',
+    'Blade.Runner.2049.2017.1080p.BluRay.x264-GRP',
+    'Star.Wars.Episode.IV.1977.1080p.BluRay.x264-GRP',
+]
+
+# Plain names the fast path is expected to handle by itself.
+FAST_PATH_NAMES = [
+    'Show.Name.S01E02.720p.HDTV.x264-GRP',
+    'Show Name S01E02 720p HDTV x264-GRP',
+    'Show.Name.S01E02E03.720p.WEB-DL.x264-GRP',
+    'Show.Name.S01E02.PROPER.720p.HDTV.x264-GRP',
+    'Doctor.Who.2005.S10E01.720p.HDTV.x264-GRP',
+    'Movie.Name.2019.1080p.BluRay.x264-GRP',
+]
+
+
+def guessit_info(title):
+    # The same normalization parse_media_info applies to guessit results.
+    info = dict(guessit.guessit(title))
+    if isinstance(info.get('episode'), int):
+        info['episode'] = [info['episode']]
+    return info
+
+
+@pytest.mark.parametrize('title', SCENE_NAMES)
+def test_parse_scene_name_agrees_with_guessit(title):
+    info = parse_scene_name(title)
+    if info is not None:
+        assert info == guessit_info(title)
+
+
+@pytest.mark.parametrize('title', FAST_PATH_NAMES)
+def test_parse_scene_name_handles_plain_names(title):
+    assert parse_scene_name(title) is not None